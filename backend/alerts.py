@@ -0,0 +1,139 @@
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+
+class AlertRule:
+    """
+    A condition on a runner's live signals. Every configured criterion must
+    hold for the rule to match; criteria left as None/False are ignored.
+    With fire_on_first=False a runner already matching when it is first seen
+    doesn't alert; it has to stop matching and match again.
+    """
+
+    def __init__(self, name: str, label: str = None, min_steam: float = None,
+                 require_d4: bool = False, require_previous_steamer: bool = False,
+                 require_value: bool = False, cooldown: float = 300, fire_on_first: bool = True):
+        self.name = name
+        self.label = label or name
+        self.min_steam = min_steam
+        self.require_d4 = require_d4
+        self.require_previous_steamer = require_previous_steamer
+        self.require_value = require_value
+        self.cooldown = cooldown
+        self.fire_on_first = fire_on_first
+
+    def matches(self, runner) -> bool:
+        if runner.is_non_runner or runner.current_odds <= 0:
+            return False
+        if self.min_steam is not None and runner.steam_percentage < self.min_steam:
+            return False
+        if self.require_d4 and not runner.is_d4:
+            return False
+        if self.require_previous_steamer and not runner.is_previous_steamer:
+            return False
+        if self.require_value and not runner.is_value:
+            return False
+        return True
+
+
+DEFAULT_RULES = [
+    # The dashboard's original audible alert
+    AlertRule("d4_steamer", "D4 steamer", min_steam=10.0, require_d4=True),
+    AlertRule("steamer", "Steamer", min_steam=10.0),
+    AlertRule("repeat_steamer", "Repeat steamer", min_steam=5.0, require_previous_steamer=True),
+    # Value only depends on the current price, so most longshots in a big
+    # field match from the first scrape: that is the market, not news
+    AlertRule("value", "Value", require_value=True, cooldown=900, fire_on_first=False),
+]
+
+
+def load_rules() -> list:
+    """Rules from the ALERT_RULES env var (a JSON list of AlertRule kwargs), else the defaults."""
+    raw = os.environ.get("ALERT_RULES")
+    if not raw:
+        return list(DEFAULT_RULES)
+    try:
+        return [AlertRule(**spec) for spec in json.loads(raw)]
+    except Exception as e:
+        print(f"Invalid ALERT_RULES ({e}), using defaults")
+        return list(DEFAULT_RULES)
+
+
+class AlertEngine:
+    """
+    Evaluates rules incrementally, only for runners that changed on a tick.
+    Alerts are edge-triggered: a rule fires when a runner starts matching,
+    not on every tick while it keeps matching, and never more often than
+    the rule's cooldown for the same runner.
+    """
+
+    def __init__(self, rules=None, history: int = 200):
+        self.rules = rules if rules is not None else load_rules()
+        self.recent = deque(maxlen=history)
+        # Ids carry the process start time, so they keep increasing across
+        # restarts and a client holding the last id it saw doesn't skip new ones
+        self._next_id = int(time.time()) * 1_000_000 + 1
+        self._matching = set()  # (race_id, runner_id, rule name) currently true
+        self._last_fired = {}  # same key -> monotonic time of last alert
+        self._seen = set()  # (race_id, runner_id) evaluated at least once
+
+    def evaluate(self, race, runners, now: float = None) -> list:
+        """
+        Check `runners` (the ones that changed) and return the new alerts.
+        `now` drives cooldowns; replays pass the tick time instead of the clock.
+        """
+        now = time.monotonic() if now is None else now
+        fired = []
+        for runner in runners:
+            first = (race.id, runner.id) not in self._seen
+            self._seen.add((race.id, runner.id))
+            for rule in self.rules:
+                key = (race.id, runner.id, rule.name)
+                if not rule.matches(runner):
+                    self._matching.discard(key)
+                    continue
+                if key in self._matching:
+                    continue
+                self._matching.add(key)
+                if first and not rule.fire_on_first:
+                    continue
+                if now - self._last_fired.get(key, float("-inf")) < rule.cooldown:
+                    continue
+                self._last_fired[key] = now
+                fired.append(self._make_alert(rule, race, runner))
+        return fired
+
+    def reset_race(self, race_id: int):
+        """Forget match state for a race (e.g. after a new baseline), keeping cooldowns."""
+        self._matching = {key for key in self._matching if key[0] != race_id}
+        self._seen = {key for key in self._seen if key[0] != race_id}
+
+    def forget_races(self, race_ids):
+        race_ids = set(race_ids)
+        self._matching = {key for key in self._matching if key[0] not in race_ids}
+        self._last_fired = {key: ts for key, ts in self._last_fired.items() if key[0] not in race_ids}
+        self._seen = {key for key in self._seen if key[0] not in race_ids}
+
+    def since(self, alert_id: int = 0) -> list:
+        return [alert for alert in self.recent if alert["id"] > alert_id]
+
+    def _make_alert(self, rule, race, runner) -> dict:
+        alert = {
+            "id": self._next_id,
+            "rule": rule.name,
+            "label": rule.label,
+            "race_id": race.id,
+            "race_name": race.name,
+            "runner_id": runner.id,
+            "runner_name": runner.name,
+            "number": runner.number,
+            "odds": runner.current_odds,
+            "steam_percentage": runner.steam_percentage,
+            "at": datetime.utcnow(),
+        }
+        self._next_id += 1
+        self.recent.append(alert)
+        return alert
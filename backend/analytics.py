@@ -0,0 +1,241 @@
+import time
+
+import numpy as np
+
+# Drift windows in seconds (1, 5 and 15 minutes)
+WINDOWS = {"1m": 60, "5m": 300, "15m": 900}
+# Velocity is measured over the last minute; acceleration compares it with the minute before
+VELOCITY_WINDOW = 60
+
+
+class OddsBuffer:
+    """
+    Recent odds for one race: a ring buffer with one row per tick and one
+    column per runner (NaN where a runner had no price). Rows are only
+    appended when some price moved; odds are piecewise constant in between,
+    so "price at time t" is the last row at or before t.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.times = np.full(capacity, np.nan)
+        self.odds = np.full((capacity, 0), np.nan)
+        self.first_odds = np.empty(0)  # earliest observed price per column
+        self.columns = {}  # runner_id -> column index
+        self.count = 0
+        self.head = 0  # next row to write
+
+    def _column_indices(self, runner_ids) -> np.ndarray:
+        new_ids = [rid for rid in runner_ids if rid not in self.columns]
+        if new_ids:
+            for rid in new_ids:
+                self.columns[rid] = len(self.columns)
+            grow = len(new_ids)
+            self.odds = np.hstack([self.odds, np.full((self.capacity, grow), np.nan)])
+            self.first_odds = np.concatenate([self.first_odds, np.full(grow, np.nan)])
+        return np.fromiter((self.columns[rid] for rid in runner_ids), dtype=np.intp, count=len(runner_ids))
+
+    def append(self, ts: float, runner_ids, odds) -> bool:
+        """Record a tick. Returns False (and stores nothing) if no price moved."""
+        cols = self._column_indices(runner_ids)
+        values = np.asarray(odds, dtype=float)
+        values[values <= 0] = np.nan
+
+        row = np.full(len(self.columns), np.nan)
+        if self.count:
+            row[:] = self.odds[(self.head - 1) % self.capacity]
+        previous = row[cols].copy()
+        row[cols] = values
+        if self.count and np.array_equal(previous, values, equal_nan=True):
+            return False
+
+        unseen = np.isnan(self.first_odds[cols]) & ~np.isnan(values)
+        self.first_odds[cols[unseen]] = values[unseen]
+
+        self.times[self.head] = ts
+        self.odds[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return True
+
+    def ordered(self):
+        """(times, odds) for stored rows, oldest first."""
+        if self.count < self.capacity:
+            return self.times[:self.count], self.odds[:self.count]
+        order = np.roll(np.arange(self.capacity), -self.head)
+        return self.times[order], self.odds[order]
+
+    def metrics(self, now: float) -> dict:
+        """All windows for the whole field in one pass."""
+        times, odds = self.ordered()
+        if not len(times):
+            return {}
+        current = odds[-1]
+
+        # Price at each lookback instant: last row at or before it (first row if none)
+        lookbacks = np.array([now - w for w in WINDOWS.values()]
+                             + [now - VELOCITY_WINDOW, now - 2 * VELOCITY_WINDOW])
+        rows = np.clip(np.searchsorted(times, lookbacks, side="right") - 1, 0, len(times) - 1)
+        reference = odds[rows]  # one row per lookback, one column per runner
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Positive = shortening, same sign convention as steam_percentage
+            drift = (reference - current) / reference * 100
+            steam_from_open = (self.first_odds - current) / self.first_odds * 100
+            minutes = VELOCITY_WINDOW / 60
+            # % per minute over the last minute, and over the minute before it
+            velocity = drift[-2] / minutes
+            previous_velocity = (reference[-1] - reference[-2]) / reference[-1] * 100 / minutes
+            acceleration = (velocity - previous_velocity) / minutes  # % per minute^2
+
+        result = {name: drift[i] for i, name in enumerate(WINDOWS)}
+        result.update(velocity=velocity, acceleration=acceleration, steam_from_open=steam_from_open)
+        return result
+
+
+def runner_signals(current_odds: float, baseline_odds, is_non_runner: bool, field_size: int):
+    """(steam_percentage, is_value) for one runner; shared by the live path and the backtest."""
+    if is_non_runner:
+        return 0.0, False
+    steam = 0.0
+    if baseline_odds and baseline_odds > 0:
+        steam = (baseline_odds - current_odds) / baseline_odds * 100
+    is_value = current_odds > 8.0 and field_size >= 8
+    return steam, is_value
+
+
+def market_book(odds, non_runner):
+    """
+    Book for one tick of a race: (implied probability per runner, normalized
+    market share in % per runner, overround as a book percentage). Non-runners
+    and unpriced runners get NaN and are left out of the book.
+    """
+    odds = np.asarray(odds, dtype=float)
+    active = ~np.asarray(non_runner, dtype=bool) & (odds > 0)
+    implied = np.full(len(odds), np.nan)
+    implied[active] = 1.0 / odds[active]
+    book = implied[active].sum()
+    if book <= 0:
+        return implied, np.full(len(odds), np.nan), None
+    return implied, implied / book * 100, float(book * 100)
+
+
+def _clean(values: np.ndarray) -> list:
+    # NaN/inf (no price in the window) -> None so it serializes as null
+    return [round(float(v), 3) if np.isfinite(v) else None for v in values]
+
+
+class SteamAnalytics:
+    """Per-race odds buffers and the metrics computed on their latest tick."""
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.buffers = {}  # race_id -> OddsBuffer
+        self.latest = {}  # race_id -> serialized metrics
+
+    def has_race(self, race_id: int) -> bool:
+        return race_id in self.buffers
+
+    def seed(self, race_id: int, ticks):
+        """Rebuild a race's buffer from stored history: (ts, runner_ids, odds) oldest first."""
+        buffer = self.buffers[race_id] = OddsBuffer(self.capacity)
+        last_ts = None
+        for ts, runner_ids, odds in ticks:
+            buffer.append(ts, runner_ids, odds)
+            last_ts = ts
+        if last_ts is not None:
+            self.latest[race_id] = self._serialize(race_id, buffer, last_ts)
+
+    def record_tick(self, race_id: int, runner_ids, odds, ts: float = None):
+        """Append a tick and recompute every window for the race's whole field."""
+        ts = ts if ts is not None else time.time()
+        buffer = self.buffers.setdefault(race_id, OddsBuffer(self.capacity))
+        buffer.append(ts, runner_ids, odds)
+        self.latest[race_id] = self._serialize(race_id, buffer, ts)
+
+    def get(self, race_id: int):
+        return self.latest.get(race_id)
+
+    def forget(self, race_ids):
+        for race_id in race_ids:
+            self.buffers.pop(race_id, None)
+            self.latest.pop(race_id, None)
+
+    def _serialize(self, race_id: int, buffer: OddsBuffer, now: float) -> dict:
+        metrics = buffer.metrics(now)
+        times, odds = buffer.ordered()
+        current = odds[-1] if len(times) else np.empty(0)
+        runners = []
+        columns = {name: _clean(values) for name, values in metrics.items()}
+        current_odds = _clean(current)
+        for runner_id, col in buffer.columns.items():
+            entry = {"runner_id": runner_id, "odds": current_odds[col] if len(current_odds) else None}
+            entry.update({
+                "drift": {name: columns[name][col] for name in WINDOWS},
+                "velocity": columns["velocity"][col],
+                "acceleration": columns["acceleration"][col],
+                "steam_from_open": columns["steam_from_open"][col],
+            })
+            runners.append(entry)
+        return {"race_id": race_id, "as_of": now, "ticks": len(times), "runners": runners}
+
+
+# Downsampling for charts. Each function takes one runner's series (times in
+# epoch seconds, ascending) and returns the kept (times, values).
+DOWNSAMPLE_METHODS = ("lttb", "minmax", "last")
+
+
+def _time_buckets(times: np.ndarray, start: float, end: float, buckets: int) -> np.ndarray:
+    # Bucket index per sample; buckets span [start, end] so every runner of a race shares them
+    span = max(end - start, 1e-9)
+    return np.minimum(((times - start) / span * buckets).astype(np.intp), buckets - 1)
+
+
+def downsample_last(times, values, points: int, start: float, end: float):
+    """Last value in each time bucket (empty buckets are skipped)."""
+    if len(times) <= points:
+        return times, values
+    idx = _time_buckets(times, start, end, points)
+    keep = np.flatnonzero(np.diff(idx, append=idx[-1] + 1))  # last sample of each bucket
+    return times[keep], values[keep]
+
+
+def downsample_minmax(times, values, points: int, start: float, end: float):
+    """Min and max of each time bucket, in time order, plus the final sample."""
+    if len(times) <= points:
+        return times, values
+    buckets = max(points // 2, 1)
+    idx = _time_buckets(times, start, end, buckets)
+    # Sort by bucket then value: each bucket's first entry is its min, its last is its max
+    order = np.lexsort((values, idx))
+    firsts = np.flatnonzero(np.diff(idx[order], prepend=-1))
+    lasts = np.append(firsts[1:], len(order)) - 1
+    keep = np.unique(np.concatenate([order[firsts], order[lasts], [len(times) - 1]]))
+    return times[keep], values[keep]
+
+
+def downsample_lttb(times, values, points: int, start: float = None, end: float = None):
+    """Largest-Triangle-Three-Buckets: keeps the samples that best preserve the shape."""
+    n = len(times)
+    if n <= points or points < 3:
+        return times, values
+    keep = np.empty(points, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    edges = np.linspace(1, n - 1, points - 1).astype(np.intp)  # points-2 inner buckets
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        nhi = max(nhi, nlo + 1)
+        avg_t, avg_v = times[nlo:nhi].mean(), values[nlo:nhi].mean()
+        area = np.abs((times[a] - avg_t) * (values[lo:hi] - values[a])
+                      - (times[a] - times[lo:hi]) * (avg_v - values[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return times[keep], values[keep]
+
+
+def downsample(method: str, times, values, points: int, start: float, end: float):
+    return {"lttb": downsample_lttb, "minmax": downsample_minmax, "last": downsample_last}[method](
+        times, values, points, start, end)
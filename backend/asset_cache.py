@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Responses are cached when the server says they can be kept at least this
+# long, or when the URL is versioned (content hash or ?v=) and so can't
+# change under the same name
+MIN_MAX_AGE = 3600
+VERSIONED_TTL = 24 * 3600
+_VERSIONED_URL = re.compile(r"([.-][0-9a-f]{8,}\.(js|css|woff2?)(\?|$))|([?&](v|ver|version|hash)=)", re.I)
+# Only these headers are replayed; the body is stored decoded, so
+# content-encoding/length from the original response would be wrong
+_KEPT_HEADERS = ("content-type", "cache-control", "last-modified", "etag")
+
+
+def cache_ttl(url: str, status: int, headers: dict):
+    """Seconds a response may be served from the cache, or None if it shouldn't be."""
+    if status != 200:
+        return None
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control or "private" in cache_control:
+        return None
+    if "immutable" in cache_control:
+        return max(VERSIONED_TTL, _max_age(cache_control) or 0)
+    max_age = _max_age(cache_control)
+    if max_age and max_age >= MIN_MAX_AGE:
+        return max_age
+    if _VERSIONED_URL.search(url):
+        return VERSIONED_TTL
+    return None
+
+
+def _max_age(cache_control: str):
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else None
+
+
+class AssetCache:
+    """
+    Disk cache for static assets (Zeturf's JS bundles and the like) served
+    from the browser's route handler, so pages in a fresh context, or after
+    a browser restart, don't download them again. Bounded to `max_bytes`
+    with least-recently-used eviction; survives restarts when `directory`
+    is on a volume. Methods are blocking and thread-safe (called through
+    asyncio.to_thread).
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> size, least recently used first
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_served = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".body"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.size += size
+        self._evict()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.directory, key)
+        return base + ".body", base + ".json"
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+    def get(self, url: str):
+        """(status, headers, body) if `url` is cached and still fresh, else None."""
+        key = self.key(url)
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            body_path, meta_path = self._paths(key)
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                if meta["expires"] < time.time():
+                    raise OSError("expired")
+                with open(body_path, "rb") as f:
+                    body = f.read()
+            except (OSError, ValueError, KeyError):
+                self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_served += len(body)
+            return meta["status"], meta["headers"], body
+
+    def put(self, url: str, status: int, headers: dict, body: bytes, ttl: float):
+        if len(body) > self.max_bytes:
+            return
+        key = self.key(url)
+        body_path, meta_path = self._paths(key)
+        meta = {
+            "url": url,
+            "status": status,
+            "headers": {name: value for name, value in headers.items() if name.lower() in _KEPT_HEADERS},
+            "expires": time.time() + ttl,
+        }
+        with self.lock:
+            self._remove(key)
+            try:
+                # Body first, metadata last: a crash mid-write leaves an entry get() rejects
+                for path, data, mode in ((body_path, body, "wb"), (meta_path, json.dumps(meta), "w")):
+                    with open(path + ".tmp", mode) as f:
+                        f.write(data)
+                    os.replace(path + ".tmp", path)
+            except OSError as e:
+                print(f"Asset cache write failed for {url}: {e}")
+                return
+            self.entries[key] = len(body)
+            self.size += len(body)
+            self._evict()
+
+    def _evict(self):
+        while self.size > self.max_bytes and self.entries:
+            key = next(iter(self.entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        size = self.entries.pop(key, None)
+        if size is not None:
+            self.size -= size
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,229 @@
+"""
+Replay recorded odds through the live steam/value/alert logic and score the
+rules against results.
+
+    python backtest.py --db database.db --from 2026-01-01 --to 2026-03-31 --workers 4
+    python backtest.py --rules rules.json --baseline stored --json results.json
+
+Races are split across worker processes; each worker streams one race at a
+time (its ticks in time order), so memory stays flat however much history
+there is. A bet is one unit on a runner the first time a rule fires for it
+in a race, settled at the last recorded price (the pari-mutuel payout is the
+final price, not the price at the alert).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from sqlmodel import Session, create_engine, select
+
+from alerts import AlertEngine, AlertRule, load_rules
+from analytics import runner_signals
+from models import OddsHistory, Race, Runner
+
+# Races per task handed to a worker
+CHUNK_SIZE = 50
+# Alert lead times are kept as a histogram with this bin width (seconds)
+LEAD_BIN = 10
+
+
+class ReplayRunner:
+    """The runner attributes the signal and alert logic read, outside the ORM."""
+
+    def __init__(self, runner):
+        self.id = runner.id
+        self.name = runner.name
+        self.number = runner.number
+        self.is_d4 = runner.is_d4
+        self.is_previous_steamer = runner.is_previous_steamer
+        # Non-runner status is only known as of the last scrape
+        self.is_non_runner = runner.is_non_runner
+        self.stored_baseline = runner.baseline_odds
+        self.baseline_odds = None
+        self.current_odds = 0.0
+        self.steam_percentage = 0.0
+        self.is_value = False
+
+
+class RuleStats:
+    def __init__(self):
+        self.bets = 0
+        self.wins = 0
+        self.returned = 0.0
+        self.leads = Counter()  # alert-to-off lead time bin -> count
+
+    def add_lead(self, seconds: float):
+        self.leads[int(seconds // LEAD_BIN) * LEAD_BIN] += 1
+
+    def merge(self, other: "RuleStats"):
+        self.bets += other.bets
+        self.wins += other.wins
+        self.returned += other.returned
+        self.leads.update(other.leads)
+
+    def median_lead(self):
+        remaining = sum(self.leads.values()) / 2
+        for lead in sorted(self.leads):
+            remaining -= self.leads[lead]
+            if remaining <= 0:
+                return lead
+        return None
+
+    def summary(self) -> dict:
+        median_lead = self.median_lead()
+        return {
+            "bets": self.bets,
+            "wins": self.wins,
+            "hit_rate": round(self.wins / self.bets * 100, 2) if self.bets else None,
+            "profit": round(self.returned - self.bets, 2),
+            "roi": round((self.returned - self.bets) / self.bets * 100, 2) if self.bets else None,
+            "median_lead_seconds": round(median_lead, 1) if median_lead is not None else None,
+        }
+
+
+def replay_race(session, race, rules, baseline: str = "open") -> dict:
+    """
+    Replay one race and return {rule name: RuleStats}.
+    baseline="open" measures steam from each runner's first recorded price;
+    "stored" uses the baseline that was set manually during the race.
+    """
+    runners = {r.id: ReplayRunner(r) for r in session.exec(select(Runner).where(Runner.race_id == race.id))}
+    field_size = len(runners)
+    engine = AlertEngine(rules, history=1)
+    fired = {}  # (rule, runner_id) -> tick time of the first alert
+
+    rows = session.exec(
+        select(OddsHistory.runner_id, OddsHistory.odds, OddsHistory.timestamp)
+        .where(OddsHistory.runner_id.in_(list(runners)))
+        .order_by(OddsHistory.timestamp)
+        .execution_options(yield_per=1000)
+    )
+    tick_time, changed = None, []
+
+    def apply_tick():
+        for alert in engine.evaluate(race, changed, now=tick_time.timestamp()):
+            fired.setdefault((alert["rule"], alert["runner_id"]), tick_time)
+
+    for runner_id, odds, timestamp in rows:
+        if timestamp != tick_time and changed:
+            apply_tick()
+            changed = []
+        tick_time = timestamp
+        runner = runners[runner_id]
+        runner.current_odds = odds
+        if runner.baseline_odds is None:
+            runner.baseline_odds = odds if baseline == "open" else runner.stored_baseline
+        runner.steam_percentage, runner.is_value = runner_signals(
+            odds, runner.baseline_odds, runner.is_non_runner, field_size)
+        changed.append(runner)
+    if changed:
+        apply_tick()
+
+    stats = {rule.name: RuleStats() for rule in rules}
+    for (rule_name, runner_id), alert_time in fired.items():
+        runner = runners[runner_id]
+        if runner.is_non_runner:
+            continue  # Stake refunded
+        rule_stats = stats[rule_name]
+        rule_stats.bets += 1
+        if runner.name == race.winner_name:
+            rule_stats.wins += 1
+            rule_stats.returned += runner.current_odds
+        if race.start_time:
+            rule_stats.add_lead((race.start_time - alert_time).total_seconds())
+    return stats
+
+
+def _replay_chunk(db_url: str, race_ids, rule_specs, baseline: str):
+    # Runs in a worker process: own engine, one race in memory at a time
+    engine = create_engine(db_url)
+    rules = [AlertRule(**spec) for spec in rule_specs]
+    totals = {rule.name: RuleStats() for rule in rules}
+    with Session(engine) as session:
+        for race_id in race_ids:
+            race = session.get(Race, race_id)
+            for name, rule_stats in replay_race(session, race, rules, baseline).items():
+                totals[name].merge(rule_stats)
+            session.expunge_all()
+    engine.dispose()
+    return totals, len(race_ids)
+
+
+def _rule_spec(rule: AlertRule) -> dict:
+    # AlertRule's attributes are its constructor arguments: copying them all
+    # means a new rule option can't be dropped on the way to the workers
+    return dict(vars(rule))
+
+
+def run_backtest(db_url: str, rules, date_from=None, date_to=None, baseline: str = "open", workers: int = None) -> dict:
+    """Backtest `rules` over every settled race in the window; returns a summary per rule."""
+    engine = create_engine(db_url)
+    with Session(engine) as session:
+        query = select(Race.id).where(Race.winner_name != None).order_by(Race.start_time)
+        if date_from:
+            query = query.where(Race.start_time >= date_from)
+        if date_to:
+            query = query.where(Race.start_time <= date_to)
+        race_ids = list(session.exec(query))
+    engine.dispose()
+
+    specs = [_rule_spec(rule) for rule in rules]
+    totals = {rule.name: RuleStats() for rule in rules}
+    chunks = [race_ids[i:i + CHUNK_SIZE] for i in range(0, len(race_ids), CHUNK_SIZE)]
+    started = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_replay_chunk, db_url, chunk, specs, baseline) for chunk in chunks]
+        for future in as_completed(futures):
+            chunk_totals, count = future.result()
+            for name, rule_stats in chunk_totals.items():
+                totals[name].merge(rule_stats)
+            done += count
+            print(f"  {done}/{len(race_ids)} races", file=sys.stderr)
+
+    return {
+        "races": len(race_ids),
+        "baseline": baseline,
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+        "rules": {name: rule_stats.summary() for name, rule_stats in totals.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest alert rules over recorded odds history")
+    parser.add_argument("--db", default="database.db", help="SQLite database file")
+    parser.add_argument("--from", dest="date_from", type=datetime.fromisoformat, help="First post time (ISO)")
+    parser.add_argument("--to", dest="date_to", type=datetime.fromisoformat, help="Last post time (ISO)")
+    parser.add_argument("--rules", help="JSON file with a list of AlertRule kwargs (default: ALERT_RULES or built-ins)")
+    parser.add_argument("--baseline", choices=("open", "stored"), default="open",
+                        help="Steam reference: first recorded price, or the manually set baseline")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--json", dest="json_out", help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    if args.rules:
+        with open(args.rules) as f:
+            rules = [AlertRule(**spec) for spec in json.load(f)]
+    else:
+        rules = load_rules()
+
+    report = run_backtest(f"sqlite:///{args.db}", rules, args.date_from, args.date_to, args.baseline, args.workers)
+
+    print(f"{report['races']} races in {report['elapsed_seconds']}s (baseline: {report['baseline']})")
+    print(f"{'rule':<20}{'bets':>8}{'wins':>8}{'hit %':>8}{'ROI %':>9}{'lead s':>9}")
+    for name, row in report["rules"].items():
+        fmt = lambda v: "-" if v is None else v
+        print(f"{name:<20}{row['bets']:>8}{row['wins']:>8}{fmt(row['hit_rate']):>8}{fmt(row['roi']):>9}{fmt(row['median_lead_seconds']):>9}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import time
+from collections import deque
+from typing import Optional
+
+from metrics import COMMIT_SECONDS
+
+
+class ChangeTracker:
+    """
+    Monotonically increasing version of the data served by /races.
+    Bumped after every commit that changes races or runners, so clients
+    can revalidate with If-None-Match instead of re-downloading the board.
+
+    Each bump also records which races/runners changed (and which races were
+    deleted) in a bounded in-memory log, so /races/changes can answer
+    "what changed since version N" without scanning the tables.
+    """
+
+    def __init__(self, max_entries: int = 2000):
+        # The epoch makes tags from a previous process (or another machine)
+        # never match the current one, even if the counters collide.
+        self.epoch = int(time.time())
+        self.version = 0
+        self._log = deque(maxlen=max_entries)  # (version, {race_id: set(runner_ids)}, set(deleted_race_ids))
+        self._listeners = []
+
+    @property
+    def etag(self) -> str:
+        return f'W/"{self.cursor}"'
+
+    @property
+    def cursor(self) -> str:
+        return f"{self.epoch}-{self.version}"
+
+    def add_listener(self, callback):
+        """Call `callback(version)` after every recorded change."""
+        self._listeners.append(callback)
+
+    def record(self, races: dict, deleted=()) -> int:
+        self.version += 1
+        self._log.append((self.version, races, set(deleted)))
+        for callback in self._listeners:
+            callback(self.version)
+        return self.version
+
+    def parse_cursor(self, cursor: str) -> Optional[int]:
+        """Version number for a cursor issued by this process, else None."""
+        try:
+            epoch, version = cursor.split("-", 1)
+            if int(epoch) != self.epoch:
+                return None
+            version = int(version)
+        except (ValueError, AttributeError):
+            return None
+        if version > self.version:
+            return None
+        return version
+
+    def changes_since(self, version: int):
+        """
+        Merge all log entries after `version`.
+        Returns ({race_id: runner_ids}, deleted_race_ids), or None when the
+        log no longer reaches back that far and the client needs a full reload.
+        """
+        if version < self.version and (not self._log or self._log[0][0] > version + 1):
+            return None
+
+        races = {}
+        deleted = set()
+        for entry_version, entry_races, entry_deleted in self._log:
+            if entry_version <= version:
+                continue
+            for race_id, runner_ids in entry_races.items():
+                races.setdefault(race_id, set()).update(runner_ids)
+                deleted.discard(race_id)
+            for race_id in entry_deleted:
+                races.pop(race_id, None)
+                deleted.add(race_id)
+        return races, deleted
+
+
+tracker = ChangeTracker()
+
+
+def mark_changed(session, race_id: int, runner_ids=()):
+    """Queue a race (and optionally some of its runners) as changed in this session."""
+    pending = session.info.setdefault("changed_races", {})
+    pending.setdefault(race_id, set()).update(runner_ids)
+
+
+def mark_deleted(session, race_ids):
+    session.info.setdefault("deleted_races", set()).update(race_ids)
+
+
+def on_commit(session, callback):
+    """Run `callback()` after the next commit_changes() on this session."""
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+def commit_changes(session):
+    """Commit, then publish whatever was marked as changed to the tracker."""
+    with COMMIT_SECONDS.time():
+        session.commit()
+    races = session.info.pop("changed_races", None)
+    deleted = session.info.pop("deleted_races", None)
+    if races or deleted:
+        tracker.record(races or {}, deleted or ())
+    for callback in session.info.pop("after_commit", []):
+        callback()
@@ -1,5 +1,6 @@
 import os
 from sqlmodel import create_engine, SQLModel
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import sessionmaker
 
 # Use persistent path on Fly.io, local path otherwise
@@ -14,6 +15,32 @@ engine = create_engine(sqlite_url, echo=False)
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
+
+def add_missing_columns():
+    """
+    create_all only creates missing tables, so columns added to existing
+    models are added here (SQLite ADD COLUMN, nullable, model default as
+    the column default where it is a plain value).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if default is not None:
+                    ddl += f" DEFAULT {int(default) if isinstance(default, bool) else repr(default)}"
+                print(f"Adding column {table.name}.{column.name}")
+                conn.execute(text(ddl))
+        # Indexes declared on existing tables (create_all skips them too)
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 def get_session():
     from sqlmodel import Session
@@ -0,0 +1,56 @@
+import asyncio
+
+# publish() target meaning every subscriber, whatever view it asked for
+ALL_VIEWS = object()
+
+
+class Broadcaster:
+    """
+    Fan-out of server-sent events to many subscribers.
+    Each event is framed once and the same bytes are queued for every
+    subscriber of the same view (any hashable key, e.g. a board filter set).
+    A subscriber that falls too far behind is disconnected; its EventSource
+    reconnects and resumes from the last event id it saw.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.subscribers = {}  # queue -> view
+
+    def subscribe(self, view=None) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers[queue] = view
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.pop(queue, None)
+
+    def views(self) -> set:
+        return set(self.subscribers.values())
+
+    def publish(self, event: str, data: str, version: int = None, event_id: str = None, view=ALL_VIEWS):
+        message = format_event(event, data, event_id)
+        for queue, subscribed_view in list(self.subscribers.items()):
+            if view is not ALL_VIEWS and subscribed_view != view:
+                continue
+            try:
+                queue.put_nowait((version, message))
+            except asyncio.QueueFull:
+                # Slow consumer: drop it rather than buffering without bound
+                self.subscribers.pop(queue, None)
+
+    def is_subscribed(self, queue: asyncio.Queue) -> bool:
+        return queue in self.subscribers
+
+
+def format_event(event: str, data: str, event_id: str = None) -> bytes:
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    for line in data.splitlines() or [""]:
+        lines.append(f"data: {line}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+broadcaster = Broadcaster()
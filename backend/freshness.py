@@ -0,0 +1,80 @@
+import os
+import time
+
+# A race is stale when its last successful scrape is older than its budget:
+# the source TTL (capped like the monitor's sleep) plus slack, never less
+# than the floor. Both can be tuned per deployment.
+FRESHNESS_FLOOR = float(os.environ.get("FRESHNESS_FLOOR", "10"))
+FRESHNESS_SLACK = float(os.environ.get("FRESHNESS_SLACK", "5"))
+MAX_POLL_INTERVAL = 30.0
+
+
+class RaceFreshness:
+    def __init__(self, watched_at: float):
+        self.watched_at = watched_at
+        self.scraped_at = None  # last successful scrape
+        self.changed_at = None  # last scrape that changed something
+        self.source_ttl = None
+        self.is_stale = False
+
+    def budget(self) -> float:
+        ttl = min(self.source_ttl or 0, MAX_POLL_INTERVAL)
+        return max(FRESHNESS_FLOOR, ttl + FRESHNESS_SLACK)
+
+    def scrape_age(self, now: float) -> float:
+        return now - (self.scraped_at or self.watched_at)
+
+    def change_age(self, now: float):
+        return now - self.changed_at if self.changed_at else None
+
+
+class FreshnessTracker:
+    """
+    How old each monitored race's data is: time since the last successful
+    scrape and since the last real change. check() reports races whose
+    staleness flipped so the caller can flag them and alert once per
+    transition.
+    """
+
+    def __init__(self):
+        self.races = {}  # race_id -> RaceFreshness
+
+    def watch(self, race_id: int, now: float = None, source_ttl=None):
+        if race_id not in self.races:
+            self.races[race_id] = RaceFreshness(now if now is not None else time.time())
+        if source_ttl and not self.races[race_id].source_ttl:
+            self.races[race_id].source_ttl = source_ttl
+
+    def forget(self, race_id: int):
+        return self.races.pop(race_id, None)
+
+    def record_scrape(self, race_id: int, scraped_at: float, source_ttl=None, changed: bool = False):
+        self.watch(race_id, scraped_at)
+        race = self.races[race_id]
+        race.scraped_at = max(race.scraped_at or 0, scraped_at)
+        if source_ttl:
+            race.source_ttl = source_ttl
+        if changed:
+            race.changed_at = scraped_at
+
+    def check(self, now: float = None) -> list:
+        """[(race_id, is_stale)] for races whose staleness changed since the last check."""
+        now = now if now is not None else time.time()
+        flipped = []
+        for race_id, race in self.races.items():
+            stale = race.scrape_age(now) > race.budget()
+            if stale != race.is_stale:
+                race.is_stale = stale
+                flipped.append((race_id, stale))
+        return flipped
+
+    def report(self, now: float = None) -> list:
+        now = now if now is not None else time.time()
+        return [{
+            "race_id": race_id,
+            "scrape_age": round(race.scrape_age(now), 1),
+            "change_age": round(race.change_age(now), 1) if race.changed_at else None,
+            "source_ttl": race.source_ttl,
+            "budget": race.budget(),
+            "is_stale": race.is_stale,
+        } for race_id, race in self.races.items()]
@@ -1,14 +1,34 @@
-from fastapi import FastAPI, Depends, BackgroundTasks
-from sqlmodel import Session, select
+from fastapi import FastAPI, Depends, BackgroundTasks, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select, delete, func, tuple_
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional
 import asyncio
+import base64
+import hashlib
+import hmac
+import re
+import os
+import threading
+from collections import OrderedDict, defaultdict
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import numpy as np
 
 from database import create_db_and_tables, get_session, engine
-from models import Race, Runner, OddsHistory, WinnerHistory
+from models import Race, Runner, OddsHistory, WinnerHistory, MonitorBatch, MonitorCheckpoint
 from scraper import ZeturfScraper
+from changes import tracker, mark_changed, mark_deleted, commit_changes, on_commit
+from alerts import AlertEngine
+from analytics import SteamAnalytics, market_book, runner_signals, downsample, DOWNSAMPLE_METHODS
+from events import broadcaster, format_event
+from freshness import FreshnessTracker
+from profiling import LoopLagMonitor, SamplingProfiler
+from program import DailyProgram
+from silks import SilkCache, SILK_CACHE_DIR, SILK_CACHE_MB, SILK_PATH, silk_path
+from snapshot import SnapshotCache, dumps, pick_encoding, runner_dict, RUNNER_FIELDS
+from metrics import (registry, SCRAPE_SECONDS, SCRAPE_PHASE_SECONDS, SCRAPES, TICK_SECONDS,
+                     PAGE_RESETS, SAVE_SECONDS, HTTP_SECONDS, STALE_TRANSITIONS)
 
 app = FastAPI()
 
@@ -19,26 +39,118 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 scraper = ZeturfScraper()
+alert_engine = AlertEngine()
+steam_analytics = SteamAnalytics()
+freshness = FreshnessTracker()
+loop_lag = LoopLagMonitor()
+profiler = SamplingProfiler()
+silk_cache = SilkCache(SILK_CACHE_DIR, SILK_CACHE_MB * 2**20)
+daily_program = DailyProgram(scraper)
+
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template so /races/{race_id}/... stays one series
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(time.perf_counter() - started, method=request.method,
+                         route=route.path if route else "unmatched", status=response.status_code)
+    return response
 
 @app.on_event("startup")
 async def on_startup():
+    # Phase 1 (before accepting connections): only the database, so /races
+    # can be answered as soon as uvicorn listens
+    set_subsystem("database", "starting")
     create_db_and_tables()
-    # Start scraper (Browser)
-    await scraper.start()
-    
+    clear_stale_flags()
+    set_subsystem("database", "up")
+    asyncio.create_task(loop_lag.run())
+    asyncio.create_task(stream_publisher())
+    asyncio.create_task(freshness_watchdog())
+    set_subsystem("stream_publisher", "up")
+
     # Initial Auto-Discovery (Disabled to maintain clean slate)
     # asyncio.create_task(init_todays_races())
-    
-    # Start background orchestrator
-    asyncio.create_task(monitor_orchestrator())
+
+    # Phase 2 (background): Chromium takes seconds to boot, and blocking here
+    # made Fly's proxy give up on auto-started machines
+    background_tasks.append(asyncio.create_task(start_scraping()))
+
+def clear_stale_flags():
+    """
+    Staleness is tracked in memory and only written when it flips, starting
+    from fresh: flags left by the previous process would never be cleared.
+    Monitored races are flagged again by the watchdog if they really are.
+    """
+    with Session(engine) as session:
+        races = session.exec(select(Race).where(Race.is_stale == True)).all()
+        for race in races:
+            race.is_stale = False
+            session.add(race)
+        session.commit()
+    if races:
+        print(f"Cleared the stale flag on {len(races)} race(s) from the previous run")
 
 @app.on_event("shutdown")
 async def on_shutdown():
+    for task in background_tasks:
+        task.cancel()
     await scraper.stop()
 
+# Startup phases and long-running subsystems, reported by /health and /ready
+PROCESS_STARTED = time.time()
+subsystems = {}  # name -> {"state": "starting" | "up" | "failed", "since", "ready_after", "error"}
+background_tasks = []
+BROWSER_RETRY_MAX = 60
+
+def set_subsystem(name: str, state: str, error: str = None):
+    now = time.time()
+    subsystems[name] = {
+        "state": state,
+        "since": round(now, 3),
+        # Seconds from process start until it first came up
+        "ready_after": round(now - PROCESS_STARTED, 3) if state == "up" else None,
+        "error": error,
+    }
+
+async def start_scraping():
+    """Launch the browser (retrying with backoff), then start monitoring."""
+    set_subsystem("browser", "starting")
+    delay = 2
+    while True:
+        try:
+            await scraper.start()
+            set_subsystem("browser", "up")
+            break
+        except Exception as e:
+            error = (str(e).splitlines() or [type(e).__name__])[0]
+            print(f"Browser launch failed ({error}). Retrying in {delay}s...")
+            set_subsystem("browser", "failed", error)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, BROWSER_RETRY_MAX)
+    await resume_monitoring()
+    background_tasks.append(asyncio.create_task(monitor_orchestrator()))
+    background_tasks.append(asyncio.create_task(result_sweeper()))
+
+async def resume_monitoring():
+    """
+    Pre-navigate pages for every race the orchestrator is about to monitor,
+    concurrently, so after a restart the tasks start on loaded pages
+    instead of opening cold ones one after another.
+    """
+    with Session(engine) as session:
+        urls = [monitor_url(session, race) for race in races_to_monitor(session)]
+    if not urls:
+        return
+    started = time.perf_counter()
+    await scraper.warm_up(urls)
+    print(f"Resuming {len(urls)} race(s): pages ready in {time.perf_counter() - started:.1f}s")
+
 async def init_todays_races():
     """Auto-discover today's French Trotting races."""
     print("Auto-discovering today's races...")
@@ -61,14 +173,59 @@ async def init_todays_races():
 
 monitoring_tasks = {}
 
+# State kept elsewhere, read when /metrics is scraped
+registry.gauge("monitor_tasks", "Running monitor_race_task tasks", callback=lambda: len(monitoring_tasks))
+registry.gauge("browser_pages", "Open browser pages",
+               callback=lambda: len(scraper.context.pages) if scraper.context else 0)
+registry.gauge("warm_pages", "Pre-navigated pages waiting for a monitor task", callback=lambda: len(scraper._warm_pages))
+registry.gauge("scrapes_in_flight", "Race scrapes currently running", callback=lambda: len(scraper._inflight))
+registry.counter("browser_restarts_total", "Browser restarts", callback=lambda: scraper.restarts)
+registry.counter("scrapes_coalesced_total", "scrape_race calls that joined an in-flight scrape",
+                 callback=lambda: scraper.coalesced)
+registry.counter("scrapes_reused_total", "scrape_race calls answered from a just-finished scrape",
+                 callback=lambda: scraper.reused)
+registry.counter("asset_cache_hits_total", "Static assets served from the scraper's disk cache",
+                 callback=lambda: scraper.asset_cache.hits if scraper.asset_cache else 0)
+registry.counter("asset_cache_misses_total", "Cacheable asset requests that went to the network",
+                 callback=lambda: scraper.asset_cache.misses if scraper.asset_cache else 0)
+registry.counter("asset_cache_evictions_total", "Assets evicted to stay under SCRAPER_ASSET_CACHE_MB",
+                 callback=lambda: scraper.asset_cache.evictions if scraper.asset_cache else 0)
+registry.counter("asset_cache_served_bytes_total", "Bytes served from the asset cache instead of downloaded",
+                 callback=lambda: scraper.asset_cache.bytes_served if scraper.asset_cache else 0)
+registry.gauge("asset_cache_bytes", "Size of the asset cache on disk",
+               callback=lambda: scraper.asset_cache.size if scraper.asset_cache else 0)
+registry.counter("silk_cache_hits_total", "/silks requests served from the disk cache", callback=lambda: silk_cache.hits)
+registry.counter("silk_cache_misses_total", "/silks requests that downloaded from pmu.fr", callback=lambda: silk_cache.misses)
+registry.counter("silk_fetch_errors_total", "Failed silk downloads", callback=lambda: silk_cache.fetch_errors)
+registry.gauge("silk_cache_bytes", "Size of the silk cache on disk", callback=lambda: silk_cache.size)
+registry.gauge("stream_subscribers", "Connected /races/stream clients", callback=lambda: len(broadcaster.subscribers))
+registry.gauge("stream_queued_events", "Events waiting in stream subscriber queues",
+               callback=lambda: sum(queue.qsize() for queue in broadcaster.subscribers))
+registry.gauge("data_version", "Current /races data version", callback=lambda: tracker.version)
+registry.gauge("race_scrape_age_seconds", "Seconds since the race's last successful scrape", ["race_id"],
+               callback=lambda: {(race_id,): row.scrape_age(time.time()) for race_id, row in freshness.races.items()})
+registry.gauge("race_change_age_seconds", "Seconds since a scrape last changed the race", ["race_id"],
+               callback=lambda: {(race_id,): row.change_age(time.time())
+                                 for race_id, row in freshness.races.items() if row.changed_at})
+registry.gauge("stale_races", "Monitored races over their freshness budget",
+               callback=lambda: sum(row.is_stale for row in freshness.races.values()))
+# Set when races are added/bumped so the orchestrator reacts without waiting out its poll
+orchestrator_wakeup = asyncio.Event()
+
+async def wait_for_orchestrator_poll(timeout: float = 5):
+    try:
+        await asyncio.wait_for(orchestrator_wakeup.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    orchestrator_wakeup.clear()
+
 async def monitor_orchestrator():
     print("Starting Orchestrator...")
+    set_subsystem("orchestrator", "up")
     while True:
         try:
             with Session(engine) as session:
-                active_races = session.exec(select(Race).where(Race.is_active == True)).all()
-                # Monitor only the latest active race (prioritizing bumped ones)
-                active_races = session.exec(select(Race).where(Race.is_active == True).order_by(Race.last_bumped_at.desc(), Race.id.desc()).limit(1)).all()
+                active_races = races_to_monitor(session)
                 active_ids = {r.id for r in active_races}
                 
                 # Start new tasks
@@ -86,19 +243,61 @@ async def monitor_orchestrator():
                         monitoring_tasks[rid].cancel()
                         del monitoring_tasks[rid]
             
-            await asyncio.sleep(5)
+            await wait_for_orchestrator_poll()
         except Exception as e:
             print(f"Orchestrator error: {e}")
             await asyncio.sleep(5)
 
+def races_to_monitor(session):
+    # Monitor only the latest active race (prioritizing bumped ones)
+    return session.exec(select(Race).where(Race.is_active == True).order_by(Race.last_bumped_at.desc(), Race.id.desc()).limit(1)).all()
+
+# Date, meeting and race number in a Zeturf race URL
+RACE_KEY = re.compile(r"/(\d{4}-\d{2}-\d{2})/R(\d+)C(\d+)")
+
+def followed_url(race_url: str, page_url: Optional[str]) -> str:
+    """
+    Where the race's page ended up (after redirects) if it is still the same
+    race, else the race URL. Scraping the landed URL keeps scrape_race on
+    its in-page refresh instead of re-navigating through the redirect.
+    """
+    key = RACE_KEY.search(race_url)
+    landed = RACE_KEY.search(page_url) if page_url else None
+    if key and landed and key.groups() == landed.groups():
+        return page_url
+    return race_url
+
+def monitor_url(session, race) -> str:
+    """The URL a monitor task for `race` opens its page on (and warm-ups pre-navigate)."""
+    checkpoint = session.get(MonitorCheckpoint, race.id)
+    return followed_url(race.url, checkpoint.page_url if checkpoint else None)
+
+# Checkpoints are rewritten when the scrape's fingerprint/TTL changes, or this often
+CHECKPOINT_INTERVAL = 60
+
 async def monitor_race_task(race_id: int):
     page = None
+    with Session(engine) as session:
+        race = session.get(Race, race_id)
+        race_url = monitor_url(session, race) if race else None
+        # Pick up the previous run's state (after a restart or a reschedule)
+        checkpoint = session.get(MonitorCheckpoint, race_id)
+        last_ttl = checkpoint.source_ttl if checkpoint else None
+        last_fingerprint = checkpoint.fingerprint if checkpoint else None
+        if race and checkpoint and checkpoint.next_race_url and not race.next_race_url:
+            # Lets the auto-switch work before the first scrape succeeds
+            race.next_race_url = checkpoint.next_race_url
+            session.add(race)
+            session.commit()
+    checkpointed_at = 0.0
+    silks_prefetched = False
+    freshness.watch(race_id, source_ttl=last_ttl)
     try:
         while True:
-            # Ensure we have a valid page
+            # Ensure we have a valid page (pre-navigated if the race was warmed up)
             if page is None:
                 try:
-                    page = await scraper.get_new_page()
+                    page = await scraper.get_new_page(race_url)
                     print(f"Task for Race {race_id}: Page created.")
                 except Exception as e:
                     print(f"Task {race_id}: Failed to get page ({e}). Retrying...")
@@ -106,6 +305,7 @@ async def monitor_race_task(race_id: int):
                     continue
 
             start_time = time.time()
+            scrape_result = None
             try:
                 with Session(engine) as session:
                     race = session.get(Race, race_id)
@@ -114,39 +314,28 @@ async def monitor_race_task(race_id: int):
                         break
                     
                     # Scrape
-                    scrape_result = await scraper.scrape_race(race.url, page=page)
+                    scrape_result = await timed_scrape(race_url, page=page)
                     
                     if scrape_result:
-                        save_race_data(session, race, scrape_result)
+                        race_url = followed_url(race.url, scrape_result.get("page_url"))
+                        with SAVE_SECONDS.time():
+                            save_race_data(session, race, scrape_result)
+                        fingerprint = scrape_fingerprint(scrape_result)
+                        ttl = scrape_result.get("next_update_seconds")
+                        if (fingerprint, ttl) != (last_fingerprint, last_ttl) or time.time() - checkpointed_at > CHECKPOINT_INTERVAL:
+                            save_checkpoint(session, race.id, scrape_result, fingerprint)
+                            last_fingerprint, last_ttl, checkpointed_at = fingerprint, ttl, time.time()
+                        if not silks_prefetched:
+                            # So the board's first load doesn't wait on pmu.fr
+                            silks_prefetched = True
+                            asyncio.create_task(silk_cache.prefetch(
+                                [silk_path(r.get("silk_url")) for r in scrape_result["runners"]]))
                     else:
                         print(f"Failed to scrape Race {race.id}")
                     
-                    session.commit()
-                    
-                    # Check Result
-                    winner_name, final_odds = await scraper.scrape_race_result(race.url, page=page)
-                    if winner_name:
-                        print(f"Result for {race.name}: {winner_name}")
-                        race.winner_name = winner_name
-                        race.result_checked = True
-                        race.is_active = False
-                        session.add(race)
-                        
-                        # Handle History
-                        winner_runner = session.exec(select(Runner).where(Runner.race_id == race.id, Runner.name == winner_name)).first()
-                        if winner_runner:
-                            steam_pct = winner_runner.steam_percentage
-                            is_steamer = steam_pct >= 10.0
-                            history = WinnerHistory(
-                                horse_name=winner_name,
-                                race_date=datetime.utcnow(),
-                                final_odds=final_odds,
-                                steam_percentage=steam_pct,
-                                is_steamer=is_steamer
-                            )
-                            session.add(history)
-                        session.commit()
-                        break # End task since inactive
+                    commit_changes(session)
+                    # Results are settled by result_sweeper(), which marks the
+                    # race inactive; the next tick then ends this task
 
                     # AUTO-SWITCH logic: 10 minutes after start
                     if race.start_time:
@@ -165,17 +354,24 @@ async def monitor_race_task(race_id: int):
                                      # Mark current as inactive so orchestrator picks up the new one
                                      race.is_active = False
                                      session.add(race)
-                                     session.commit()
+                                     session.flush()
+                                     mark_changed(session, race.id)
+                                     mark_changed(session, new_race.id)
+                                     commit_changes(session)
+                                     forget_live_state([race.id])
                                      break # End current task
                                  else:
                                      # Already exists, just stop this one
                                      race.is_active = False
                                      session.add(race)
-                                     session.commit()
+                                     mark_changed(session, race.id)
+                                     commit_changes(session)
+                                     forget_live_state([race.id])
                                      break
 
             except Exception as e:
                 print(f"Error in task {race_id}: {e} (Resetting page)")
+                PAGE_RESETS.inc()
                 # Kill bad page
                 if page:
                     try:
@@ -186,9 +382,10 @@ async def monitor_race_task(race_id: int):
             
             # Sleep logic
             elapsed = time.time() - start_time
+            TICK_SECONDS.observe(elapsed)
             
-            # Dynamic sleep based on Zeturf's internal TTL
-            next_update = (scrape_result.get("next_update_seconds") if scrape_result else None)
+            # Dynamic sleep based on Zeturf's internal TTL (the last known one if this scrape failed)
+            next_update = (scrape_result.get("next_update_seconds") if scrape_result else last_ttl)
             
             if next_update and next_update > 10:
                 # If race is starting soon (< 5 mins), poll faster regardless of TTL
@@ -222,15 +419,58 @@ async def monitor_race_task(race_id: int):
                 pass
             print(f"Task {race_id}: Page closed.")
 
-def save_race_data(session, race, scrape_result):
+async def timed_scrape(url: str, **kwargs):
+    """scraper.scrape_race, recording its duration, outcome and per-phase timings."""
+    started = time.perf_counter()
+    result = await scraper.scrape_race(url, **kwargs)
+    outcome = "ok" if result else "failed"
+    SCRAPE_SECONDS.observe(time.perf_counter() - started, result=outcome)
+    SCRAPES.inc(result=outcome)
+    for phase, seconds in (result or {}).get("timings", {}).items():
+        SCRAPE_PHASE_SECONDS.observe(seconds, phase=phase)
+    return result
+
+def scrape_fingerprint(scrape_result) -> str:
+    """Short hash of what a scrape saw; equal fingerprints mean nothing on the page moved."""
+    runners = [(r["name"], r["odds"], r["is_d4"], r["shoeing_status"], r.get("is_non_runner", False))
+               for r in scrape_result["runners"]]
+    payload = dumps([scrape_result.get("title"), scrape_result.get("next_race_url"), runners])
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+def save_checkpoint(session, race_id: int, scrape_result, fingerprint: str):
+    # Not a board change: written on the tick's commit without bumping the version
+    checkpoint = session.get(MonitorCheckpoint, race_id) or MonitorCheckpoint(race_id=race_id)
+    checkpoint.page_url = scrape_result.get("page_url")
+    checkpoint.source_ttl = scrape_result.get("next_update_seconds")
+    checkpoint.fingerprint = fingerprint
+    checkpoint.next_race_url = scrape_result.get("next_race_url")
+    scraped_at = scrape_result.get("scraped_at")
+    checkpoint.scraped_at = datetime.utcfromtimestamp(scraped_at) if scraped_at else None
+    checkpoint.updated_at = datetime.utcnow()
+    session.add(checkpoint)
+
+def save_race_data(session, race, scrape_result) -> bool:
+    """
+    Apply a scrape result to the race and mark what changed on the session
+    (picked up by commit_changes). Returns True if anything visible changed.
+    """
     runners_data = scrape_result["runners"]
     race_title = scrape_result["title"]
     race_time_str = scrape_result.get("time_str")
     race_timestamp = scrape_result.get("timestamp")
+    race_changed = False
+    changed_runners = []
+    tick_runners = []
+    odds_moved = []
     
+    # Not shown on the board: read by the auto-switch only
+    if scrape_result.get("next_race_url"):
+        race.next_race_url = scrape_result["next_race_url"]
+
     # Update race title/time if needed
     if race.name == "Wait for scrape..." and race_title:
         race.name = race_title
+        race_changed = True
     
     # Parse time
     if not race.start_time:
@@ -238,6 +478,7 @@ def save_race_data(session, race, scrape_result):
             try:
                 # detailed timestamp is usually in seconds for Zeturf based on verification
                 race.start_time = datetime.utcfromtimestamp(race_timestamp)
+                race_changed = True
             except Exception as e:
                 print(f"Error parsing timestamp {race_timestamp}: {e}")
         
@@ -257,6 +498,7 @@ def save_race_data(session, race, scrape_result):
                     # User feedback: Zeturf time is likely already accurate for display or strictly UTC in context of issue
                     # Previously we did -1 hour. User said it was 1 hour behind. So we remove the subtraction.
                     race.start_time = race_dt_cet
+                    race_changed = True
             except Exception as e:
                 print(f"Error parsing time {race_time_str}: {e}")
 
@@ -267,6 +509,7 @@ def save_race_data(session, race, scrape_result):
     for r_data in runners_data:
             runner = session.exec(select(Runner).where(Runner.race_id == race.id, Runner.name == r_data["name"])).first()
             is_nr = r_data.get("is_non_runner", False)
+            runner_changed = False
             
             if not runner:
                 history = session.exec(select(WinnerHistory).where(WinnerHistory.horse_name == r_data["name"], WinnerHistory.is_steamer == True)).first()
@@ -285,12 +528,15 @@ def save_race_data(session, race, scrape_result):
                     jockey=r_data.get("jockey")
                 )
                 session.add(runner)
+                runner_changed = True
+                odds_moved.append(runner)
             else:
                 # Only update last_updated if actual data changes to help frontend caching
                 has_changed = False
                 if runner.current_odds != r_data["odds"]:
                     runner.current_odds = r_data["odds"]
                     has_changed = True
+                    odds_moved.append(runner)
                 if runner.is_d4 != r_data["is_d4"]:
                     runner.is_d4 = r_data["is_d4"] 
                     has_changed = True
@@ -312,23 +558,511 @@ def save_race_data(session, race, scrape_result):
                 
                 if has_changed:
                     runner.last_updated = datetime.utcnow()
+                    runner_changed = True
             
-            if not is_nr:
-                if runner.baseline_odds and runner.baseline_odds > 0:
-                     obs_diff = runner.baseline_odds - runner.current_odds
-                     runner.steam_percentage = (obs_diff / runner.baseline_odds) * 100
-                else:
-                     runner.steam_percentage = 0.0
-                
-                if runner.current_odds > 8.0 and current_runners_count >= 8:
-                    runner.is_value = True
-                else:
-                    runner.is_value = False
-            else:
-                 runner.steam_percentage = 0.0
-                 runner.is_value = False
+            previous_signals = (runner.steam_percentage, runner.is_value)
+            runner.steam_percentage, runner.is_value = runner_signals(
+                runner.current_odds, runner.baseline_odds, is_nr, current_runners_count)
+            
+            if (runner.steam_percentage, runner.is_value) != previous_signals:
+                runner_changed = True
                 
             session.add(runner)
+            tick_runners.append(runner)
+            if runner_changed:
+                changed_runners.append(runner)
+
+    if apply_market_book(race, tick_runners, changed_runners):
+        race_changed = True
+
+    # New runners need their ids before they can go into the change log
+    if any(r.id is None for r in changed_runners):
+        session.flush()
+
+    tick_time = datetime.utcnow()
+    for runner in odds_moved:
+        session.add(OddsHistory(runner_id=runner.id, odds=runner.current_odds, timestamp=tick_time))
+    record_odds_tick(session, race, tick_runners, tick_time)
+
+    changed = race_changed or bool(changed_runners)
+    scraped_at = scrape_result.get("scraped_at") or time.time()
+    source_ttl = scrape_result.get("next_update_seconds")
+    freshness.record_scrape(race.id, scraped_at, source_ttl, changed)
+    if not changed:
+        return False
+
+    # Stamped on changed rows only: an unchanged scrape must not bump the version
+    scraped_dt = datetime.utcfromtimestamp(scraped_at)
+    race.last_changed_at = scraped_dt
+    for runner in changed_runners:
+        runner.scraped_at = scraped_dt
+        runner.source_ttl = source_ttl
+
+    mark_changed(session, race.id, [r.id for r in changed_runners])
+
+    # Only runners that changed on this tick can start matching a rule
+    alerts = alert_engine.evaluate(race, changed_runners)
+    if alerts:
+        on_commit(session, lambda: publish_alerts(alerts))
+    return True
+
+def apply_market_book(race, runners, changed_runners) -> bool:
+    """
+    Implied probabilities, market share and its shift since the baseline for
+    the whole field, plus the race overround. Any price move changes every
+    runner's share, so runners whose share moved join `changed_runners`.
+    Returns True if the overround changed.
+    """
+    if not runners:
+        return False
+    implied, share, overround = market_book([r.current_odds for r in runners],
+                                            [r.is_non_runner for r in runners])
+    for runner, p, s in zip(runners, implied.tolist(), share.tolist()):
+        p = round(p, 4) if p == p else None  # NaN -> not in the book
+        s = round(s, 2) if s == s else None
+        shift = round(s - runner.baseline_market_share, 2) if s is not None and runner.baseline_market_share else 0.0
+        if (runner.implied_probability, runner.market_share, runner.market_share_shift) != (p, s, shift):
+            runner.implied_probability = p
+            runner.market_share = s
+            runner.market_share_shift = shift
+            if runner not in changed_runners:
+                changed_runners.append(runner)
+
+    overround = round(overround, 2) if overround is not None else None
+    if race.overround == overround:
+        return False
+    race.overround = overround
+    return True
+
+def _epoch(dt: datetime) -> float:
+    # Stored datetimes are naive UTC
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+def record_odds_tick(session, race, runners, tick_time: datetime):
+    """Feed this tick's prices (NR as no price) into the race's analytics buffer."""
+    if not steam_analytics.has_race(race.id):
+        seed_race_analytics(session, race.id)
+    odds = [0.0 if r.is_non_runner else r.current_odds for r in runners]
+    steam_analytics.record_tick(race.id, [r.id for r in runners], odds, _epoch(tick_time))
+
+def seed_race_analytics(session, race_id: int):
+    """Rebuild a race's buffer from OddsHistory (e.g. after a restart)."""
+    rows = session.exec(
+        select(OddsHistory.timestamp, OddsHistory.runner_id, OddsHistory.odds)
+        .join(Runner, Runner.id == OddsHistory.runner_id)
+        .where(Runner.race_id == race_id)
+        .order_by(OddsHistory.timestamp)
+    ).all()
+    ticks = []
+    for timestamp, runner_id, odds in rows:
+        if not ticks or ticks[-1][0] != timestamp:
+            ticks.append((timestamp, [], []))
+        ticks[-1][1].append(runner_id)
+        ticks[-1][2].append(odds)
+    steam_analytics.seed(race_id, [(_epoch(ts), ids, odds) for ts, ids, odds in ticks])
+
+def delete_odds_history(session, runner_ids):
+    if runner_ids:
+        session.exec(delete(OddsHistory).where(OddsHistory.runner_id.in_(runner_ids)))
+
+def forget_history(race_ids):
+    # Race ids can be reused once deleted, so drop their cached history
+    race_ids = set(race_ids)
+    for key in [key for key in history_cache if key[0] in race_ids]:
+        del history_cache[key]
+
+async def freshness_watchdog():
+    """
+    Once a second, flag races whose last successful scrape is older than
+    their freshness budget (and unflag them when scrapes resume). Only
+    transitions touch the database, so a healthy board costs nothing.
+    """
+    while True:
+        await asyncio.sleep(1)
+        try:
+            flipped = []
+            for race_id in list(freshness.races):
+                task = monitoring_tasks.get(race_id)
+                if task is None or task.done():
+                    # No longer monitored: stop tracking, and drop the flag if it was set
+                    row = freshness.forget(race_id)
+                    if row and row.is_stale:
+                        flipped.append((race_id, False))
+            flipped += freshness.check()
+            if not flipped:
+                continue
+
+            with Session(engine) as session:
+                for race_id, is_stale in flipped:
+                    race = session.get(Race, race_id)
+                    if not race or race.is_stale == is_stale:
+                        continue
+                    race.is_stale = is_stale
+                    session.add(race)
+                    mark_changed(session, race.id)
+                    STALE_TRANSITIONS.inc(state="stale" if is_stale else "fresh")
+                    row = freshness.races.get(race_id)
+                    if is_stale:
+                        print(f"STALE: {race.name} (race {race_id}) last scraped "
+                              f"{row.scrape_age(time.time()):.0f}s ago, budget {row.budget():.0f}s")
+                    else:
+                        print(f"Fresh again: {race.name} (race {race_id})")
+                commit_changes(session)
+        except Exception as e:
+            print(f"Freshness watchdog error: {e}")
+
+# Results are looked for once a race is this far past its start time, for
+# races that started up to RESULT_LOOKBACK ago; after that they are given up on
+RESULT_SWEEP_INTERVAL = 120
+RESULT_DELAY = timedelta(minutes=3)
+RESULT_LOOKBACK = timedelta(days=2)
+RESULT_SWEEP_CONCURRENCY = 4
+# A race whose result isn't posted yet is retried after RESULT_SWEEP_INTERVAL,
+# doubling each miss up to this (abandoned or delayed races)
+RESULT_MAX_BACKOFF = timedelta(hours=1)
+result_retries = {}  # race_id -> (misses, datetime of the next attempt)
+
+async def result_sweeper():
+    """
+    Settle finished races in bulk: every RESULT_SWEEP_INTERVAL, read the
+    results of every race that is past its start and still unsettled,
+    monitored or not, one page per meeting, and write them in one commit.
+    Races still without a result back off (see RESULT_MAX_BACKOFF).
+    """
+    set_subsystem("result_sweeper", "up")
+    while True:
+        try:
+            await sweep_results()
+        except Exception as e:
+            print(f"Result sweep error: {e}")
+        await asyncio.sleep(RESULT_SWEEP_INTERVAL)
+
+async def sweep_results():
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        # Past the lookback without a result: stop asking for it
+        expired = session.exec(
+            select(Race).where(
+                Race.result_checked == False,
+                Race.start_time != None,
+                Race.start_time <= now - RESULT_LOOKBACK,
+            )
+        ).all()
+        for race in expired:
+            race.result_checked = True
+            session.add(race)
+            mark_changed(session, race.id)
+            result_retries.pop(race.id, None)
+        if expired:
+            commit_changes(session)
+            print(f"Result sweep: gave up on {len(expired)} race(s) past the lookback with no result")
+
+        pending = [
+            (race_id, url) for race_id, url in session.exec(
+                select(Race.id, Race.url).where(
+                    Race.result_checked == False,
+                    Race.start_time != None,
+                    Race.start_time < now - RESULT_DELAY,
+                )
+            ).all()
+            if race_id not in result_retries or result_retries[race_id][1] <= now
+        ]
+    if not pending:
+        return
+
+    # One page per meeting visits its pending races in turn
+    by_meeting = defaultdict(dict)
+    for race_id, url in pending:
+        match = re.search(r"/(\d{4}-\d{2}-\d{2})/R(\d+)C", url)
+        by_meeting[match.groups() if match else url][url] = race_id
+    semaphore = asyncio.Semaphore(RESULT_SWEEP_CONCURRENCY)
+
+    async def read(races):
+        async with semaphore:
+            return {races[url]: result for url, result in (await scraper.scrape_results(list(races))).items()}
+
+    results = {}
+    for meeting_results in await asyncio.gather(*(read(races) for races in by_meeting.values())):
+        results.update(meeting_results)
+    settled = settle_results(results)
+    for race_id, _ in pending:
+        if results.get(race_id, (None, None))[0]:
+            result_retries.pop(race_id, None)
+        else:
+            misses = result_retries.get(race_id, (0, None))[0] + 1
+            backoff = min(timedelta(seconds=RESULT_SWEEP_INTERVAL * 2 ** (misses - 1)), RESULT_MAX_BACKOFF)
+            result_retries[race_id] = (misses, now + backoff)
+    print(f"Result sweep: {settled}/{len(pending)} race(s) settled across {len(by_meeting)} meeting(s)")
+
+def settle_results(results: dict) -> int:
+    """Apply {race_id: (winner_name, final_odds)} in one commit; returns how many races were settled."""
+    settled = []
+    with Session(engine) as session:
+        for race_id, (winner_name, final_odds) in results.items():
+            race = session.get(Race, race_id)
+            if not winner_name or not race or race.result_checked:
+                continue
+            print(f"Result for {race.name}: {winner_name}")
+            race.winner_name = winner_name
+            race.result_checked = True
+            race.is_active = False
+            session.add(race)
+
+            # Handle History
+            winner_runner = session.exec(select(Runner).where(Runner.race_id == race.id, Runner.name == winner_name)).first()
+            if winner_runner:
+                steam_pct = winner_runner.steam_percentage
+                history = WinnerHistory(
+                    horse_name=winner_name,
+                    race_date=race.start_time or datetime.utcnow(),
+                    # Last price we scraped if the result page doesn't show one
+                    final_odds=final_odds or winner_runner.current_odds,
+                    steam_percentage=steam_pct,
+                    is_steamer=steam_pct >= 10.0
+                )
+                session.add(history)
+            mark_changed(session, race.id)
+            settled.append(race.id)
+        commit_changes(session)
+    forget_live_state(settled)
+    return len(settled)
+
+def forget_live_state(race_ids):
+    """Drop in-memory tick state for races that stopped being monitored (history stays cached)."""
+    if race_ids:
+        steam_analytics.forget(list(race_ids))
+        alert_engine.forget_races(race_ids)
+
+def publish_alerts(alerts):
+    for alert in alerts:
+        print(f"ALERT {alert['label']}: #{alert['number']} {alert['runner_name']} "
+              f"{alert['steam_percentage']:.1f}% @ {alert['odds']} ({alert['race_name']})")
+        broadcaster.publish("alert", dumps(alert).decode())
+
+@app.get("/silks/{path:path}")
+async def get_silk(path: str, request: Request):
+    """PMU silk image, downloaded once and then served from the local cache."""
+    if not SILK_PATH.match(path):
+        return Response(status_code=404, content=dumps({"error": "Unknown silk"}), media_type="application/json")
+    silk = await silk_cache.get(path)
+    if not silk:
+        # Often just not published yet; let browsers retry later
+        return Response(status_code=404, headers={"Cache-Control": "public, max-age=600"})
+    digest, body = silk
+    etag = f'"{digest[:16]}"'
+    # A silk path is fixed for its race, so browsers can keep it for good
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="image/png", headers=headers)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of timings, counters and gauges."""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
+# /admin endpoints need a matching X-Admin-Token header; unset disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+def is_admin(request: Request) -> bool:
+    supplied = request.headers.get("x-admin-token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode())
+MAX_PROFILE_SECONDS = 60
+
+@app.post("/admin/profile")
+async def profile(request: Request, seconds: float = 10, interval_ms: float = 5, threads: str = "loop"):
+    """
+    Sample the running process for `seconds` and return folded stacks
+    (flamegraph.pl / speedscope input). threads=loop samples only the event
+    loop thread, which is where stalls hurt; threads=all includes the
+    executor and Playwright driver threads.
+    """
+    if not is_admin(request):
+        return Response(status_code=403, content=dumps({"error": "Forbidden"}), media_type="application/json")
+    if threads not in ("loop", "all"):
+        return Response(status_code=400, content=dumps({"error": f"Unknown threads: {threads}"}), media_type="application/json")
+    if profiler.busy:
+        return Response(status_code=409, content=dumps({"error": "A profile is already running"}), media_type="application/json")
+    seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+    interval = min(max(interval_ms, 1), 1000) / 1000
+    thread_ids = {threading.get_ident()} if threads == "loop" else None
+    try:
+        folded, samples = await asyncio.to_thread(profiler.sample, seconds, interval, thread_ids)
+    except RuntimeError as e:
+        return Response(status_code=409, content=dumps({"error": str(e)}), media_type="application/json")
+    return Response(content=folded, media_type="text/plain",
+                    headers={"X-Profile-Samples": str(samples), "X-Loop-Lag-Max": f"{loop_lag.max_lag:.3f}"})
+
+# Needed for /ready: without the browser nothing gets scraped
+READY_SUBSYSTEMS = ("database", "browser", "orchestrator")
+
+def _subsystem_report() -> dict:
+    report = {name: dict(row) for name, row in subsystems.items()}
+    # The browser can go away after boot (restart in progress)
+    if report.get("browser", {}).get("state") == "up" and not scraper.browser:
+        report["browser"]["state"] = "starting"
+    return report
+
+@app.get("/health")
+async def health():
+    # Liveness: the process is serving. Used by the Fly check, so it must not
+    # wait on the browser
+    return Response(content=dumps({"status": "ok", "uptime": round(time.time() - PROCESS_STARTED, 1),
+                                   "subsystems": _subsystem_report()}), media_type="application/json")
+
+@app.get("/ready")
+async def ready():
+    report = _subsystem_report()
+    pending = [name for name in READY_SUBSYSTEMS if report.get(name, {}).get("state") != "up"]
+    return Response(status_code=503 if pending else 200,
+                    content=dumps({"ready": not pending, "waiting_for": pending, "subsystems": report}),
+                    media_type="application/json")
+
+@app.get("/alerts")
+async def get_alerts(since: int = 0):
+    """Recent alerts after id `since`; the stream delivers the same objects live."""
+    return Response(content=dumps(alert_engine.since(since)), media_type="application/json")
+
+@app.get("/races/{race_id}/analytics")
+async def get_race_analytics(race_id: int, session: Session = Depends(get_session)):
+    """Drift over 1/5/15 minutes, velocity, acceleration and steam from open for every runner."""
+    seeded = not steam_analytics.has_race(race_id)
+    if seeded:
+        seed_race_analytics(session, race_id)
+    result = steam_analytics.get(race_id)
+    race = session.get(Race, race_id)
+    if seeded and not (race and race.is_active):
+        # Nothing will tick a finished race again: don't keep its buffer around
+        steam_analytics.forget([race_id])
+    if result is None:
+        return Response(status_code=404, content=dumps({"error": "No odds recorded for race"}), media_type="application/json")
+    return Response(content=dumps(result), media_type="application/json")
+
+# Finished races' history never changes, so their encoded bodies are kept (LRU)
+HISTORY_CACHE_SIZE = 256
+history_cache = OrderedDict()  # (race_id, method, points) -> bytes
+
+@app.get("/races/{race_id}/history")
+async def get_race_history(race_id: int, points: int = 120, method: str = "lttb",
+                           session: Session = Depends(get_session)):
+    """
+    Odds series per runner, downsampled to at most ~`points` samples each.
+    Times are epoch seconds; buckets span the whole race so series line up.
+    - method=lttb: keep the samples that best preserve each line's shape
+    - method=minmax: min and max of each time bucket (spikes survive)
+    - method=last: last price in each time bucket
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        return Response(status_code=400, content=dumps({"error": f"Unknown method: {method}"}), media_type="application/json")
+    points = max(2, min(points, 2000))
+    race = session.get(Race, race_id)
+    if not race:
+        return Response(status_code=404, content=dumps({"error": "Race not found"}), media_type="application/json")
+
+    key = (race_id, method, points)
+    if key in history_cache:
+        history_cache.move_to_end(key)
+        return Response(content=history_cache[key], media_type="application/json")
+
+    if race.is_active:
+        # Live races: read and send one runner at a time, so a long race's
+        # history is never held in memory at once
+        return StreamingResponse(_stream_history(race_id, method, points), media_type="application/json")
+
+    rows = session.exec(
+        select(OddsHistory.runner_id, OddsHistory.timestamp, OddsHistory.odds)
+        .join(Runner, Runner.id == OddsHistory.runner_id)
+        .where(Runner.race_id == race_id)
+        .order_by(OddsHistory.runner_id, OddsHistory.timestamp)
+    ).all()
+    body = b"".join(_history_chunks(race_id, method, points, rows))
+    history_cache[key] = body
+    if len(history_cache) > HISTORY_CACHE_SIZE:
+        history_cache.popitem(last=False)
+    return Response(content=body, media_type="application/json")
+
+def _epoch_seconds(timestamps) -> np.ndarray:
+    # Naive UTC datetimes -> epoch seconds without a Python call per row
+    return np.array(timestamps, dtype="datetime64[us]").astype(np.int64) / 1e6
+
+def _history_header(race_id: int, method: str, points: int, start, end) -> bytes:
+    return dumps({"race_id": race_id, "method": method, "points": points, "start": start, "end": end})[:-1] + b',"series":['
+
+def _history_chunks(race_id: int, method: str, points: int, rows):
+    runner_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    times = _epoch_seconds([row[1] for row in rows])
+    odds = np.array([row[2] for row in rows], dtype=float)
+    start, end = (float(times.min()), float(times.max())) if len(times) else (None, None)
+
+    yield _history_header(race_id, method, points, start, end)
+    # Rows are sorted by runner, so each runner is one contiguous slice
+    bounds = np.flatnonzero(np.diff(runner_ids, prepend=-1, append=-1))
+    for i, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+        t, v = downsample(method, times[lo:hi], odds[lo:hi], points, start, end)
+        series = {"runner_id": int(runner_ids[lo]), "t": np.round(t, 1).tolist(), "odds": v.tolist()}
+        yield (b"," if i else b"") + dumps(series)
+    yield b"]}"
+
+def _stream_history(race_id: int, method: str, points: int):
+    """
+    _history_chunks for a live race, straight from the database: the race's
+    time span first (buckets line up across runners), then one indexed
+    (runner_id, timestamp) read per runner. A sync generator, so Starlette
+    runs it in a worker thread; it opens its own session because the
+    request's is closed once the response starts.
+    """
+    with Session(engine) as session:
+        runner_ids = session.exec(select(Runner.id).where(Runner.race_id == race_id).order_by(Runner.id)).all()
+        first, last = session.exec(
+            select(func.min(OddsHistory.timestamp), func.max(OddsHistory.timestamp))
+            .where(OddsHistory.runner_id.in_(runner_ids))
+        ).one() if runner_ids else (None, None)
+        start, end = (float(t) for t in _epoch_seconds([first, last])) if first else (None, None)
+
+        yield _history_header(race_id, method, points, start, end)
+        sent = 0
+        for runner_id in runner_ids:
+            rows = session.exec(
+                select(OddsHistory.timestamp, OddsHistory.odds)
+                .where(OddsHistory.runner_id == runner_id)
+                .order_by(OddsHistory.timestamp)
+            ).all()
+            if not rows:
+                continue
+            t, v = downsample(method, _epoch_seconds([row[0] for row in rows]),
+                              np.array([row[1] for row in rows], dtype=float), points, start, end)
+            series = {"runner_id": runner_id, "t": np.round(t, 1).tolist(), "odds": v.tolist()}
+            yield (b"," if sent else b"") + dumps(series)
+            sent += 1
+    yield b"]}"
+
+@app.get("/program")
+async def get_program(date: Optional[str] = None, refresh: bool = False):
+    """
+    The day's French trotting card from the program cache. Served from the
+    database straight away; a stale cache is refreshed in the background
+    (refresh=true waits for a full re-read instead).
+    """
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        return Response(status_code=400, content=dumps({"error": "date must be YYYY-MM-DD"}), media_type="application/json")
+
+    if refresh:
+        await daily_program.refresh(date, force=True)
+    with Session(engine) as session:
+        payload, needs_refresh = daily_program.load(session, date)
+    if needs_refresh and not payload["meetings"] and not refresh:
+        # Nothing cached yet: this first discovery has to be waited for
+        await daily_program.refresh(date)
+        refresh = True
+        with Session(engine) as session:
+            payload, needs_refresh = daily_program.load(session, date)
+    if needs_refresh and not refresh and not payload["refreshing"]:
+        asyncio.create_task(daily_program.refresh(date))
+        payload["refreshing"] = True
+    return Response(content=dumps(payload), media_type="application/json")
 
 @app.post("/monitor")
 async def monitor_race(url: str, session: Session = Depends(get_session)):
@@ -338,16 +1072,71 @@ async def monitor_race(url: str, session: Session = Depends(get_session)):
         # Bump to top
         existing.last_bumped_at = datetime.utcnow()
         session.add(existing)
-        session.commit()
+        mark_changed(session, existing.id)
+        commit_changes(session)
+        orchestrator_wakeup.set()
         return {"message": "Already monitoring (Bumped to top)", "id": existing.id}
     
     race = Race(url=url, name="Wait for scrape...", meeting="Unknown")
     # last_bumped_at is set by default_factory
     session.add(race)
-    session.commit()
+    session.flush()
+    mark_changed(session, race.id)
+    commit_changes(session)
+    orchestrator_wakeup.set()
     session.refresh(race)
     return {"message": "Added race", "id": race.id}
 
+@app.post("/monitor/batch")
+async def monitor_races(batch: MonitorBatch, session: Session = Depends(get_session)):
+    """
+    Add or bump many races in one go: explicit race URLs and/or every trotting
+    race of a meeting. The first race in card order ends up on top, so it is
+    monitored first and the auto-switch walks down the card from there.
+    """
+    urls = [u.strip() for u in batch.urls if u.strip()]
+    if batch.meeting_url:
+        meeting_urls = await scraper.scrape_meeting(batch.meeting_url)
+        if not meeting_urls:
+            return {"error": "No trotting races found for meeting"}
+        urls.extend(meeting_urls)
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {"error": "No race URLs given"}
+
+    existing = {r.url: r for r in session.exec(select(Race).where(Race.url.in_(urls))).all()}
+    now = datetime.utcnow()
+    added, bumped = [], []
+    for i, url in enumerate(urls):
+        race = existing.get(url)
+        if race:
+            bumped.append(race)
+        else:
+            race = Race(url=url, name="Wait for scrape...", meeting="Unknown")
+            added.append(race)
+        # Step bump times down the list to keep the card order on the board
+        race.last_bumped_at = now - timedelta(milliseconds=i)
+        session.add(race)
+
+    session.flush()
+    added_ids = [r.id for r in added]
+    bumped_ids = [r.id for r in bumped]
+    for race_id in added_ids + bumped_ids:
+        mark_changed(session, race_id)
+    commit_changes(session)
+
+    # Only the race(s) the orchestrator is about to start need a page; the
+    # warm-up is created first so the new monitor task finds it in flight
+    warm_urls = [monitor_url(session, race) for race in races_to_monitor(session) if race.id not in monitoring_tasks]
+    if warm_urls:
+        asyncio.create_task(scraper.warm_up(warm_urls))
+    orchestrator_wakeup.set()
+    return {
+        "message": f"Added {len(added_ids)} races, bumped {len(bumped_ids)}",
+        "added": added_ids,
+        "bumped": bumped_ids,
+    }
+
 @app.post("/baseline/{race_id}")
 async def set_baseline(race_id: int, session: Session = Depends(get_session)):
     race = session.get(Race, race_id)
@@ -358,22 +1147,31 @@ async def set_baseline(race_id: int, session: Session = Depends(get_session)):
     for runner in runners:
         runner.baseline_odds = runner.current_odds
         runner.steam_percentage = 0.0 # Reset steam on new baseline
+        runner.baseline_market_share = runner.market_share
+        runner.market_share_shift = 0.0
         session.add(runner)
     
     race.baseline_set_at = datetime.utcnow()
     session.add(race)
-    session.commit()
+    mark_changed(session, race.id, [r.id for r in runners])
+    commit_changes(session)
+    # Steam starts again from zero, so rules may fire again (cooldowns still apply)
+    alert_engine.reset_race(race_id)
     return {"message": "Baseline set"}
 
+# A scrape this recent is as fresh as a new page load would be
+REFRESH_MAX_AGE = 3.0
+
 @app.post("/refresh/{race_id}")
 async def refresh_race(race_id: int, session: Session = Depends(get_session)):
     race = session.get(Race, race_id)
     if not race:
         return {"error": "Race not found"}
     
-    # Trigger immediate scrape
+    # Trigger immediate scrape; joins the monitor's scrape if one is running
+    # and reuses its result if it just finished (same URL, so same single-flight key)
     print(f"Manual refresh for {race.url}...")
-    scrape_result = await scraper.scrape_race(race.url)
+    scrape_result = await timed_scrape(monitor_url(session, race), max_age=REFRESH_MAX_AGE)
     
     if not scrape_result:
         return {"error": "Scrape failed"}
@@ -381,38 +1179,302 @@ async def refresh_race(race_id: int, session: Session = Depends(get_session)):
     runners_data = scrape_result["runners"]
     
     # Use the shared save function to update DB
-    save_race_data(session, race, scrape_result)
+    with SAVE_SECONDS.time():
+        save_race_data(session, race, scrape_result)
     
-    session.commit()
+    commit_changes(session)
     return {"message": "Refreshed"}
 
+races_snapshot = SnapshotCache()
+
+def _load_races_payload(**filters):
+    with Session(engine) as session:
+        return _build_races_payload(session, **filters)
+
 @app.get("/races")
-async def get_races(session: Session = Depends(get_session)):
-    # Return all races, sorted by is_active (True first), then last_bumped_at desc
-    races = session.exec(select(Race).order_by(Race.is_active.desc(), Race.last_bumped_at.desc(), Race.id.desc())).all()
+async def get_races(
+    request: Request,
+    active_only: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    running_only: bool = False,
+    fields: Optional[str] = None,
+):
+    """
+    The board, optionally narrowed:
+    - active_only: only races still being monitored
+    - date_from / date_to: post time window (bump time for races not scraped yet)
+    - limit / cursor: keyset pages; the next cursor comes back in X-Next-Cursor
+    - running_only: drop non-runners and runners without a price
+    - fields: comma-separated runner columns to return (id is always included)
+    """
+    # Revalidation: if the client already has this version, skip the DB entirely
+    etag = tracker.etag
+    if etag in request.headers.get("if-none-match", "").split(", "):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    runner_fields = None
+    if fields:
+        runner_fields = ("id",) + tuple(f for f in dict.fromkeys(f.strip() for f in fields.split(",")) if f and f != "id")
+        unknown = [f for f in runner_fields if f not in RUNNER_FIELDS]
+        if unknown:
+            return Response(status_code=400, content=dumps({"error": f"Unknown runner fields: {', '.join(unknown)}"}), media_type="application/json")
+    after = None
+    if cursor:
+        after = _decode_page_cursor(cursor)
+        if after is None:
+            return Response(status_code=400, content=dumps({"error": "Invalid cursor"}), media_type="application/json")
+    if limit is not None:
+        limit = max(1, min(limit, 500))
+
+    filters = dict(
+        active_only=active_only, date_from=date_from, date_to=date_to, limit=limit,
+        after=after, running_only=running_only, runner_fields=runner_fields,
+    )
+
+    # Encoded once per data version and shared by every client
+    encoding = pick_encoding(request.headers.get("accept-encoding"))
+    body, encoding, next_cursor = races_snapshot.get(
+        tracker.version, lambda: _load_races_payload(**filters), encoding, _snapshot_key(filters))
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Board order: active first, then most recently bumped, then newest.
+# Pages are keyset-based on the same tuple so inserts don't shift them.
+_race_bumped = func.coalesce(Race.last_bumped_at, datetime(1970, 1, 1))
+_RACE_ORDER = (Race.is_active.desc(), _race_bumped.desc(), Race.id.desc())
+
+def _encode_page_cursor(race) -> str:
+    bumped = (race.last_bumped_at or datetime(1970, 1, 1)).isoformat()
+    raw = f"{int(race.is_active)}|{bumped}|{race.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_page_cursor(cursor: str):
+    try:
+        is_active, bumped, race_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return bool(int(is_active)), datetime.fromisoformat(bumped), int(race_id)
+    except Exception:
+        return None
+
+def _snapshot_key(filters: dict):
+    # Plain requests share one view; each distinct filter set gets its own
+    return tuple(filters.values()) if any(v not in (None, False) for v in filters.values()) else None
+
+def _filter_races(query, active_only=False, date_from=None, date_to=None):
+    if active_only:
+        query = query.where(Race.is_active == True)
+    if date_from or date_to:
+        post_time = func.coalesce(Race.start_time, Race.last_bumped_at)
+        if date_from:
+            query = query.where(post_time >= date_from)
+        if date_to:
+            query = query.where(post_time < date_to)
+    return query
+
+def _build_races_payload(session, active_only=False, date_from=None, date_to=None, limit=None,
+                         after=None, running_only=False, runner_fields=None):
+    """Returns (races, next_page_cursor)."""
+    query = _filter_races(select(Race), active_only, date_from, date_to)
+    if after:
+        query = query.where(tuple_(Race.is_active, _race_bumped, Race.id) < tuple_(*after))
+    query = query.order_by(*_RACE_ORDER)
+    if limit:
+        query = query.limit(limit + 1)
+    races = session.exec(query).all()
+
+    next_cursor = None
+    if limit and len(races) > limit:
+        races = races[:limit]
+        next_cursor = _encode_page_cursor(races[-1])
     
     # Pre-fetch all runners to avoid N+1 queries
     race_ids = [r.id for r in races]
-    all_runners = session.exec(select(Runner).where(Runner.race_id.in_(race_ids))).all() if race_ids else []
-    
     runners_by_race = {rid: [] for rid in race_ids}
-    for runner in all_runners:
-        runners_by_race[runner.race_id].append(runner)
+    if race_ids:
+        if runner_fields:
+            # Projection: only read the requested columns
+            runner_query = select(Runner.race_id, *[getattr(Runner, f) for f in runner_fields])
+        else:
+            runner_query = select(Runner)
+        runner_query = runner_query.where(Runner.race_id.in_(race_ids))
+        if running_only:
+            runner_query = runner_query.where(Runner.is_non_runner == False, Runner.current_odds > 0)
+        for runner in session.exec(runner_query).all():
+            runners_by_race[runner.race_id].append(runner)
         
-    data = []
-    for race in races:
-        data.append({
-            "id": race.id,
-            "url": race.url,
-            "name": race.name,
-            "start_time": race.start_time,
-            "baseline_set_at": race.baseline_set_at,
-            "last_bumped_at": race.last_bumped_at,
-            "is_active": race.is_active,
-            "winner_name": race.winner_name,
-            "runners": runners_by_race[race.id]
-        })
-    return data
+    return [_race_dict(race, runners_by_race[race.id], runner_fields) for race in races], next_cursor
+
+def _race_dict(race, runners, runner_fields=None):
+    return {
+        "id": race.id,
+        "url": race.url,
+        "name": race.name,
+        "start_time": race.start_time,
+        "baseline_set_at": race.baseline_set_at,
+        "last_bumped_at": race.last_bumped_at,
+        "is_active": race.is_active,
+        "winner_name": race.winner_name,
+        "overround": race.overround,
+        "last_changed_at": race.last_changed_at,
+        "is_stale": race.is_stale,
+        "runners": [runner_dict(r, runner_fields) for r in runners]
+    }
+
+@app.get("/races/freshness")
+async def get_race_freshness():
+    # Ages move every second, so this is computed per request rather than versioned
+    return Response(content=dumps(freshness.report()), media_type="application/json")
+
+def board_view(active_only: bool = False, date_from: Optional[datetime] = None,
+               date_to: Optional[datetime] = None, running_only: bool = False):
+    """
+    The /races filters a dashboard keeps its board to, as a hashable key
+    (None for the whole board) shared by /races/changes and /races/stream.
+    """
+    view = (active_only, date_from, date_to, running_only)
+    return view if any(v not in (None, False) for v in view) else None
+
+def _view_filters(view) -> dict:
+    active_only, date_from, date_to, running_only = view or (False, None, None, False)
+    return dict(active_only=active_only, date_from=date_from, date_to=date_to, limit=None,
+                after=None, running_only=running_only, runner_fields=None)
+
+@app.get("/races/changes")
+async def get_race_changes(since: Optional[str] = None, active_only: bool = False,
+                           date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                           running_only: bool = False):
+    """
+    Races and runners changed after the `since` cursor (the `version` of a
+    previous response), plus ids of deleted races. Races carry only their
+    changed runners; clients merge them by id. Unknown or expired cursors
+    get the full board with `full: true`.
+    The /races filters narrow the board: full reloads are that view of it,
+    and changed races that fall outside it come back in `deleted`.
+    running_only only trims full reloads; deltas still carry a runner that
+    was scratched so the client can hide it.
+    """
+    since_version = tracker.parse_cursor(since) if since else None
+    view = board_view(active_only, date_from, date_to, running_only)
+    return Response(content=_build_changes_body(since_version, view), media_type="application/json")
+
+def _build_changes_body(since_version: Optional[int], view=None) -> bytes:
+    version = tracker.cursor
+    changes = tracker.changes_since(since_version) if since_version is not None else None
+    if changes is None:
+        # Full reload: splice the shared /races snapshot instead of re-encoding it
+        filters = _view_filters(view)
+        races, _, _ = races_snapshot.get(tracker.version, lambda: _load_races_payload(**filters),
+                                         key=_snapshot_key(filters))
+        return b'{"version":"%s","full":true,"races":%s,"deleted":[]}' % (version.encode(), races)
+
+    changed_races, deleted = changes
+    with Session(engine) as session:
+        return dumps(_build_delta_payload(session, version, changed_races, deleted, view))
+
+def _build_delta_payload(session, version: str, changed_races: dict, deleted: set, view=None):
+    runner_ids = set().union(*changed_races.values()) if changed_races else set()
+    races = []
+    if changed_races:
+        active_only, date_from, date_to, _ = view or (False, None, None, False)
+        races = session.exec(_filter_races(select(Race).where(Race.id.in_(changed_races.keys())),
+                                           active_only, date_from, date_to)).all()
+        # Changed races outside the view (finished, or out of the window) leave the client's board
+        deleted = set(deleted) | (set(changed_races) - {race.id for race in races})
+    runners = session.exec(select(Runner).where(Runner.id.in_(runner_ids))).all() if runner_ids else []
+
+    runners_by_race = {r.id: [] for r in races}
+    for runner in runners:
+        if runner.race_id in runners_by_race:
+            runners_by_race[runner.race_id].append(runner)
+
+    return {
+        "version": version,
+        "full": False,
+        "races": [_race_dict(race, runners_by_race[race.id]) for race in races],
+        "deleted": sorted(deleted),
+    }
+
+# Live stream: one publisher turns tracker bumps into "changes" events and
+# fans the same encoded bytes out to every connected dashboard.
+stream_wakeup = asyncio.Event()
+tracker.add_listener(lambda version: stream_wakeup.set())
+
+async def stream_publisher():
+    published = tracker.version
+    while True:
+        try:
+            await stream_wakeup.wait()
+            stream_wakeup.clear()
+            if tracker.version == published:
+                continue
+            if not broadcaster.subscribers:
+                published = tracker.version
+                continue
+
+            version, cursor = tracker.version, tracker.cursor
+            # One body per board view that has subscribers
+            for view in broadcaster.views():
+                body = _build_changes_body(published, view)
+                broadcaster.publish("changes", body.decode(), version, cursor, view=view)
+            published = version
+        except Exception as e:
+            print(f"Stream publisher error: {e}")
+            await asyncio.sleep(1)
+
+@app.get("/races/stream")
+async def stream_races(request: Request, since: Optional[str] = None, active_only: bool = False,
+                       date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+                       running_only: bool = False):
+    """
+    Server-sent events: a `changes` event (same shape as /races/changes,
+    including its view filters) on connect, then one per applied update,
+    plus an `alert` event whenever a rule fires. Change event ids are
+    version cursors, so a reconnecting EventSource resumes via Last-Event-ID.
+    """
+    cursor = request.headers.get("last-event-id") or since
+    since_version = tracker.parse_cursor(cursor) if cursor else None
+    view = board_view(active_only, date_from, date_to, running_only)
+
+    # Subscribe before building the catch-up payload so nothing falls in between
+    queue = broadcaster.subscribe(view)
+    initial_version, initial_cursor = tracker.version, tracker.cursor
+    initial = _build_changes_body(since_version, view)
+
+    async def event_stream():
+        try:
+            yield b"retry: 2000\n\n"
+            yield format_event("changes", initial.decode(), initial_cursor)
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    version, message = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    if not broadcaster.is_subscribed(queue):
+                        break
+                    yield b": ping\n\n"
+                    continue
+                # Already covered by the catch-up payload
+                if version is not None and version <= initial_version:
+                    continue
+                yield message
+                if queue.empty() and not broadcaster.is_subscribed(queue):
+                    # Dropped for falling behind; the client reconnects and resumes
+                    break
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.post("/reset")
 async def reset_database(session: Session = Depends(get_session)):
@@ -430,14 +1492,22 @@ async def reset_database(session: Session = Depends(get_session)):
         other_runners = session.exec(statement_runners).all()
         for r in other_runners:
             session.delete(r)
+        delete_odds_history(session, [r.id for r in other_runners])
             
         # Delete other races
         statement_races = select(Race).where(Race.id != latest_race.id)
         other_races = session.exec(statement_races).all()
         for r in other_races:
             session.delete(r)
+        mark_deleted(session, [r.id for r in other_races])
+        session.exec(delete(MonitorCheckpoint).where(MonitorCheckpoint.race_id != latest_race.id))
+        alert_engine.forget_races(r.id for r in other_races)
+        steam_analytics.forget([r.id for r in other_races])
+        forget_history([r.id for r in other_races])
+        for r in other_races:
+            result_retries.pop(r.id, None)
             
-        session.commit()
+        commit_changes(session)
         return {"message": "Database reset (kept latest race)"}
     else:
         # No races, just clear everything (safe fallback)
@@ -445,9 +1515,17 @@ async def reset_database(session: Session = Depends(get_session)):
         # Simpler: Delete all
         runners = session.exec(select(Runner)).all()
         for r in runners: session.delete(r)
+        delete_odds_history(session, [r.id for r in runners])
         
         races = session.exec(select(Race)).all()
         for r in races: session.delete(r)
+        mark_deleted(session, [r.id for r in races])
+        session.exec(delete(MonitorCheckpoint))
+        alert_engine.forget_races(r.id for r in races)
+        steam_analytics.forget([r.id for r in races])
+        forget_history([r.id for r in races])
+        for r in races:
+            result_retries.pop(r.id, None)
         
-        session.commit()
+        commit_changes(session)
         return {"message": "Database cleared (no races found)"}
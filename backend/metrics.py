@@ -0,0 +1,164 @@
+import time
+from contextlib import contextmanager
+
+# Seconds; covers a fast DB write up to a slow page load
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Base for counters and gauges. With `callback`, values are read when
+    /metrics is scraped (a number, or {label values tuple: number}) instead
+    of being recorded, which suits state other objects already keep.
+    """
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labels=(), callback=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labels)
+        self.callback = callback
+        self.values = {}  # label values tuple -> value
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.samples().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+    def samples(self) -> dict:
+        if not self.callback:
+            return self.values
+        try:
+            value = self.callback()
+        except Exception:
+            return {}
+        return value if isinstance(value, dict) else {(): value}
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self.values.get(key)
+        if series is None:
+            # Per-bucket (non-cumulative) counts, then sum and count
+            series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """
+    Process-wide metrics in the Prometheus text format. Recording is a dict
+    update on the event loop thread; formatting only happens when /metrics
+    is scraped.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels=(), callback=None) -> Counter:
+        return self.register(Counter(name, help_text, labels, callback))
+
+    def gauge(self, name: str, help_text: str, labels=(), callback=None) -> Gauge:
+        return self.register(Gauge(name, help_text, labels, callback))
+
+    def histogram(self, name: str, help_text: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Scraper
+SCRAPE_SECONDS = registry.histogram("scrape_seconds", "scrape_race wall time", ["result"])
+SCRAPE_PHASE_SECONDS = registry.histogram(
+    "scrape_phase_seconds", "Time per scrape phase (navigate, refresh, refresh_wait, extract)", ["phase"])
+SCRAPES = registry.counter("scrapes_total", "Race scrapes by outcome (ok, failed)", ["result"])
+
+# Monitor tasks
+TICK_SECONDS = registry.histogram("monitor_tick_seconds", "One monitor_race_task iteration (scrape, save, checkpoint)")
+PAGE_RESETS = registry.counter("page_resets_total", "Monitor pages closed and recreated after an error")
+SAVE_SECONDS = registry.histogram("save_race_data_seconds", "save_race_data for one scrape")
+COMMIT_SECONDS = registry.histogram("commit_seconds", "commit_changes (SQLite commit plus change log)")
+STALE_TRANSITIONS = registry.counter("stale_transitions_total", "Races flagged stale or fresh again", ["state"])
+
+# HTTP
+HTTP_SECONDS = registry.histogram("http_request_seconds", "Request handling time by route", ["method", "route", "status"])
@@ -1,6 +1,7 @@
 from typing import Optional, List
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 
 class Race(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -14,6 +15,9 @@ class Race(SQLModel, table=True):
     result_checked: bool = Field(default=False) # New: Has result been processed?
     winner_name: Optional[str] = None # New: Store winner for record
     next_race_url: Optional[str] = None # New: URL for the next race in the meeting
+    overround: Optional[float] = None # Book percentage of the declared field (100 = fair book)
+    last_changed_at: Optional[datetime] = None # Scrape time of the last scrape that changed anything
+    is_stale: bool = False # Last successful scrape is older than the freshness budget
 
     runners: List["Runner"] = Relationship(back_populates="race")
 
@@ -32,16 +36,56 @@ class Runner(SQLModel, table=True):
     is_value: bool = False 
     is_previous_steamer: bool = False # New: Flag if horse was a steamer winner before
     is_non_runner: bool = False # New: Flag if horse is a non-runner
+    implied_probability: Optional[float] = None # 1 / odds, before removing the overround
+    market_share: Optional[float] = None # Normalized probability, % of the book
+    baseline_market_share: Optional[float] = None # market_share when the baseline was set
+    market_share_shift: float = 0.0 # market_share - baseline_market_share, in points
     last_updated: datetime = Field(default_factory=datetime.utcnow)
+    scraped_at: Optional[datetime] = None # Scrape that produced the current values
+    source_ttl: Optional[int] = None # Zeturf's next-update countdown at that scrape (seconds)
     
     race: Race = Relationship(back_populates="runners")
 
 class OddsHistory(SQLModel, table=True):
+    # Series are always read per runner in time order
+    __table_args__ = (Index("ix_oddshistory_runner_id_timestamp", "runner_id", "timestamp"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     runner_id: int = Field(foreign_key="runner.id")
     odds: float
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
+class MonitorCheckpoint(SQLModel, table=True):
+    # A monitor task's runtime state, so a restart can pick up where it left off
+    race_id: int = Field(foreign_key="race.id", primary_key=True)
+    page_url: Optional[str] = None # Where the page actually ended up (after redirects)
+    source_ttl: Optional[int] = None # Zeturf's last next-update countdown (seconds)
+    fingerprint: Optional[str] = None # Hash of the last scrape's title, runners and odds
+    next_race_url: Optional[str] = None
+    scraped_at: Optional[datetime] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ProgramMeeting(SQLModel, table=True):
+    # Daily program cache: one meeting listed for a date
+    id: Optional[int] = Field(default=None, primary_key=True)
+    date: str = Field(index=True) # YYYY-MM-DD, as in Zeturf URLs
+    url: str = Field(index=True)
+    number: Optional[int] = None # R<number>
+    name: Optional[str] = None
+    is_france: bool = False
+    race_count: int = 0 # Trotting races on the card
+    checked_at: Optional[datetime] = None # Last successful read of the meeting page
+
+class ProgramRace(SQLModel, table=True):
+    # Daily program cache: a trotting race of a ProgramMeeting
+    id: Optional[int] = Field(default=None, primary_key=True)
+    meeting_id: int = Field(foreign_key="programmeeting.id", index=True)
+    url: str
+    name: str = ""
+    race_number: Optional[int] = None # C<number>
+    discipline: str = "trot" # trot (harness) or monte (mounted)
+    post_time: Optional[datetime] = None # Card time converted to naive UTC, like Race.start_time
+
 class WinnerHistory(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     horse_name: str = Field(index=True)
@@ -49,3 +93,8 @@ class WinnerHistory(SQLModel, table=True):
     final_odds: float
     steam_percentage: float
     is_steamer: bool = Field(default=False) # True if steam >= 10%
+
+class MonitorBatch(SQLModel):
+    # Request body for /monitor/batch (not a table)
+    urls: List[str] = []
+    meeting_url: Optional[str] = None
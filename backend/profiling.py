@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+from metrics import registry
+
+LAG_INTERVAL = 0.1  # How often the lag probe is scheduled (seconds)
+# A loop that hasn't run the probe for this long is reported as stalled,
+# with the stack it is stuck in
+STALL_THRESHOLD = float(os.environ.get("LOOP_STALL_THRESHOLD", "0.5"))
+
+LOOP_LAG_SECONDS = registry.histogram(
+    "event_loop_lag_seconds", "How late a scheduled callback ran on the event loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+LOOP_STALLS = registry.counter("event_loop_stalls_total", "Times the event loop was blocked past LOOP_STALL_THRESHOLD")
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop lag: a probe sleeps LAG_INTERVAL and records how much
+    later than that it actually woke up. A watchdog thread notices when the
+    probe stops running altogether (a synchronous call holding the loop) and
+    logs the loop thread's stack once per stall, so slow ticks can be pinned
+    on the code that caused them.
+    """
+
+    def __init__(self):
+        self.loop_thread_id = None
+        self.beat = time.monotonic()
+        self.max_lag = 0.0
+        self._stalled = False
+
+    async def run(self):
+        self.loop_thread_id = threading.get_ident()
+        threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True).start()
+        while True:
+            expected = time.monotonic() + LAG_INTERVAL
+            await asyncio.sleep(LAG_INTERVAL)
+            self.beat = time.monotonic()
+            lag = max(0.0, self.beat - expected)
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG_SECONDS.observe(lag)
+
+    def _watch(self):
+        while True:
+            time.sleep(STALL_THRESHOLD / 2)
+            blocked = time.monotonic() - self.beat
+            if blocked < STALL_THRESHOLD:
+                self._stalled = False
+                continue
+            if self._stalled:
+                continue
+            self._stalled = True
+            LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(no frame)\n"
+            print(f"Event loop blocked for {blocked:.2f}s, currently in:\n{stack}", end="")
+
+
+def _frame_label(code) -> str:
+    parts = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+
+
+def _folded(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """
+    Time-boxed stack sampler for the running process. Every `interval`
+    seconds it reads the current stacks from sys._current_frames() and
+    counts them; the result is in the folded format ("root;...;leaf count")
+    that flamegraph.pl and speedscope load directly. Nothing is installed
+    into the interpreter, so it can run against production without a
+    restart and costs nothing when idle.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+    def sample(self, seconds: float, interval: float, thread_ids=None) -> tuple:
+        """Blocking: run in a worker thread. Returns (folded stacks text, samples taken)."""
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            stacks = Counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            me = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            samples = 0
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == me or (thread_ids is not None and thread_id not in thread_ids):
+                        continue
+                    stacks[f"{names.get(thread_id, thread_id)};{_folded(frame)}"] += 1
+                samples += 1
+                time.sleep(interval)
+        finally:
+            self.lock.release()
+        text = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        return text, samples
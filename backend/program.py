@@ -0,0 +1,167 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlmodel import Session, select, delete
+
+from database import engine
+from models import ProgramMeeting, ProgramRace, Race
+
+# The day page is re-read at most this often (new meetings are rare)
+MEETING_LIST_TTL = 15 * 60
+# A French meeting with races still to run is re-read at most this often;
+# once its last race is off, its card doesn't change any more
+MEETING_RECHECK = 30 * 60
+# Meeting pages read at once
+MEETING_CONCURRENCY = 4
+
+
+# Card times are French local time
+CARD_TIMEZONE = ZoneInfo("Europe/Paris")
+
+
+def parse_post_time(date_str: str, post_time: str):
+    """Card time ("13h50", Paris) on `date_str` as a naive UTC datetime, or None."""
+    if not post_time:
+        return None
+    try:
+        hour, minute = post_time.split("h")
+        local = datetime.strptime(date_str, "%Y-%m-%d").replace(hour=int(hour), minute=int(minute), tzinfo=CARD_TIMEZONE)
+    except ValueError:
+        return None
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def meeting_needs_check(meeting: ProgramMeeting, races: list, now: datetime) -> bool:
+    if meeting.checked_at is None:
+        return True
+    # The country doesn't change: foreign meetings are read once
+    if not meeting.is_france or now - meeting.checked_at < timedelta(seconds=MEETING_RECHECK):
+        return False
+    return not races or any(r.post_time is None or r.post_time > now for r in races)
+
+
+class DailyProgram:
+    """
+    Cache of each day's trotting program (meetings, races, post times) in
+    the database. refresh() only re-reads meeting pages that can still
+    change (never read, or French with races still to run) and the day
+    page when its list is old, so repeat calls cost a handful of page loads
+    instead of a full discovery. One refresh per date runs at a time.
+    """
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.listed_at = {}  # date -> time.time() of the last day page read
+        self.refreshing = {}  # date -> Task
+
+    def load(self, session: Session, date_str: str) -> tuple:
+        """(payload, needs_refresh) for a date, from the database only."""
+        meetings = session.exec(
+            select(ProgramMeeting).where(ProgramMeeting.date == date_str).order_by(ProgramMeeting.number, ProgramMeeting.id)
+        ).all()
+        races_by_meeting = {m.id: [] for m in meetings}
+        if meetings:
+            for race in session.exec(
+                select(ProgramRace).where(ProgramRace.meeting_id.in_(list(races_by_meeting)))
+                .order_by(ProgramRace.race_number, ProgramRace.id)
+            ).all():
+                races_by_meeting[race.meeting_id].append(race)
+        race_urls = {r.url for races in races_by_meeting.values() for r in races}
+        monitored = {url: race_id for url, race_id in session.exec(
+            select(Race.url, Race.id).where(Race.url.in_(list(race_urls)))).all()} if race_urls else {}
+
+        now = datetime.utcnow()
+        needs_refresh = (not meetings
+                         or time.time() - self.listed_at.get(date_str, 0) > MEETING_LIST_TTL
+                         or any(meeting_needs_check(m, races_by_meeting[m.id], now) for m in meetings))
+        checked = [m.checked_at for m in meetings if m.checked_at]
+        payload = {
+            "date": date_str,
+            "checked_at": max(checked) if checked else None,
+            "refreshing": date_str in self.refreshing,
+            "meetings": [{
+                "url": m.url,
+                "number": m.number,
+                "name": m.name,
+                "checked_at": m.checked_at,
+                "races": [{
+                    "url": r.url,
+                    "name": r.name,
+                    "race_number": r.race_number,
+                    "discipline": r.discipline,
+                    "post_time": r.post_time,
+                    "race_id": monitored.get(r.url),
+                } for r in races_by_meeting[m.id]],
+            } for m in meetings if m.is_france and races_by_meeting[m.id]],
+        }
+        return payload, needs_refresh
+
+    async def refresh(self, date_str: str, force: bool = False):
+        task = self.refreshing.get(date_str)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(date_str, force))
+            self.refreshing[date_str] = task
+            task.add_done_callback(lambda _: self.refreshing.pop(date_str, None))
+        await asyncio.shield(task)
+
+    async def _refresh(self, date_str: str, force: bool):
+        started = time.perf_counter()
+        with Session(engine) as session:
+            meetings = {m.url: m for m in session.exec(select(ProgramMeeting).where(ProgramMeeting.date == date_str)).all()}
+
+        if force or not meetings or time.time() - self.listed_at.get(date_str, 0) > MEETING_LIST_TTL:
+            urls = await self.scraper.scrape_program_meetings(date_str)
+            if urls:
+                self.listed_at[date_str] = time.time()
+                with Session(engine) as session:
+                    for url in urls:
+                        if url not in meetings:
+                            session.add(ProgramMeeting(date=date_str, url=url))
+                    session.commit()
+                    meetings = {m.url: m for m in session.exec(select(ProgramMeeting).where(ProgramMeeting.date == date_str)).all()}
+
+        with Session(engine) as session:
+            now = datetime.utcnow()
+            due = []
+            for meeting in meetings.values():
+                races = session.exec(select(ProgramRace).where(ProgramRace.meeting_id == meeting.id)).all()
+                if force or meeting_needs_check(meeting, races, now):
+                    due.append(meeting.url)
+
+        semaphore = asyncio.Semaphore(MEETING_CONCURRENCY)
+
+        async def read(url):
+            async with semaphore:
+                return url, await self.scraper.scrape_meeting_card(url)
+
+        cards = await asyncio.gather(*(read(url) for url in due))
+        with Session(engine) as session:
+            for url, card in cards:
+                if card is not None:
+                    self._store_card(session, meetings[url].id, date_str, card)
+            session.commit()
+        print(f"Program {date_str}: read {len(due)}/{len(meetings)} meeting(s) in {time.perf_counter() - started:.1f}s")
+
+    @staticmethod
+    def _store_card(session: Session, meeting_id: int, date_str: str, card: dict):
+        meeting = session.get(ProgramMeeting, meeting_id)
+        meeting.number = card["number"]
+        meeting.name = card["name"]
+        meeting.is_france = card["is_france"]
+        meeting.race_count = len(card["races"])
+        meeting.checked_at = datetime.utcnow()
+        session.add(meeting)
+
+        existing = {r.url: r for r in session.exec(select(ProgramRace).where(ProgramRace.meeting_id == meeting_id)).all()}
+        for data in card["races"]:
+            race = existing.pop(data["url"], None) or ProgramRace(meeting_id=meeting_id, url=data["url"])
+            race.name = data["name"]
+            race.race_number = data["race_number"]
+            race.discipline = data["discipline"]
+            race.post_time = parse_post_time(date_str, data["post_time"])
+            session.add(race)
+        # Races no longer on the card (withdrawn or re-numbered)
+        if existing:
+            session.exec(delete(ProgramRace).where(ProgramRace.id.in_([r.id for r in existing.values()])))
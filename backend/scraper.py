@@ -1,14 +1,96 @@
 import asyncio
+import os
 import re
+import time
 from playwright.async_api import async_playwright
 
+from asset_cache import AssetCache, cache_ttl
+
+# Site root; point at a local fixture server (fixture_server.py) for load tests
+BASE_URL = os.environ.get("ZETURF_BASE_URL", "https://www.zeturf.com").rstrip("/")
+
+# Pre-navigated pages kept for races about to be monitored
+MAX_WARM_PAGES = 4
+WARM_PAGE_TTL = 300
+
+# Chromium launch profiles, picked with SCRAPER_PROFILE (benchmark.py --profiles
+# compares them). Every page we load is the same light odds table with
+# images, fonts and stylesheets blocked, so most of Chromium's defaults are
+# memory we don't need.
+_LEAN_ARGS = [
+    "--disable-dev-shm-usage",  # /dev/shm is tiny in containers
+    "--disable-extensions",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+]
+LAUNCH_PROFILES = {
+    # Fit the most pages on the 1 GB VM: share renderers, no GPU process,
+    # no background traffic, small caches and a capped V8 heap
+    "low-memory": {
+        "args": _LEAN_ARGS + [
+            "--renderer-process-limit=2",
+            "--disable-gpu",
+            "--disable-software-rasterizer",
+            "--disable-background-networking",
+            "--disable-features=Translate,MediaRouter,OptimizationHints,BackForwardCache",
+            "--disk-cache-size=1048576",
+            "--media-cache-size=1048576",
+            "--js-flags=--max-old-space-size=96",
+        ],
+        "context": {"viewport": {"width": 800, "height": 600}, "service_workers": "block"},
+        "concurrency": 6,
+    },
+    "balanced": {
+        "args": _LEAN_ARGS + ["--disable-gpu", "--disable-background-networking"],
+        "context": {},
+        "concurrency": 10,
+    },
+    # Keep background pages running at full speed (monitor pages are never
+    # visible, so Chromium would otherwise throttle their timers)
+    "throughput": {
+        "args": _LEAN_ARGS + [
+            "--disable-renderer-backgrounding",
+            "--disable-background-timer-throttling",
+            "--disable-backgrounding-occluded-windows",
+        ],
+        "context": {},
+        "concurrency": 20,
+    },
+}
+DEFAULT_PROFILE = os.environ.get("SCRAPER_PROFILE", "balanced")
+
+# On-disk cache for static assets (JS bundles etc.), shared by every page and
+# kept across browser restarts. Off unless a directory is configured.
+ASSET_CACHE_DIR = os.environ.get("SCRAPER_ASSET_CACHE_DIR")
+ASSET_CACHE_MB = int(os.environ.get("SCRAPER_ASSET_CACHE_MB", "64"))
+CACHEABLE_TYPES = ("script", "stylesheet", "font", "image")
+# Monitor pages never need these
+BLOCKED_TYPES = ("image", "media", "font", "stylesheet")
+
 class ZeturfScraper:
-    def __init__(self):
+    def __init__(self, profile: str = None):
+        self.profile = profile or DEFAULT_PROFILE
+        if self.profile not in LAUNCH_PROFILES:
+            raise ValueError(f"Unknown scraper profile {self.profile!r} (choose from {', '.join(LAUNCH_PROFILES)})")
         self.browser = None
         self.context = None
         self.playwright = None
         self._lock = None
         self._sem = None
+        # Single-flight state for scrape_race, keyed by normalized URL
+        self._inflight = {}  # url -> Task
+        self._recent = {}  # url -> (monotonic time, result)
+        # Pages already navigated to a race, waiting for its monitor task
+        self._warm_pages = {}  # url -> (monotonic time, page)
+        self._warming = {}  # url -> Task navigating a page for _warm_pages
+        # Running totals for /metrics
+        self.restarts = 0
+        self.coalesced = 0  # scrape_race calls that joined an in-flight scrape
+        self.reused = 0  # scrape_race calls answered from a result within max_age
+        self.asset_cache = AssetCache(ASSET_CACHE_DIR, ASSET_CACHE_MB * 2**20) if ASSET_CACHE_DIR else None
 
     def _construct_pmu_silk_url(self, date_str, meeting_num, race_num, runner_num):
         # date_str in YYYY-MM-DD from Zeturf URL -> DDMMYYYY for PMU
@@ -25,7 +107,7 @@ class ZeturfScraper:
         if not self._lock:
             self._lock = asyncio.Lock()
         if not self._sem:
-            self._sem = asyncio.Semaphore(10)
+            self._sem = asyncio.Semaphore(LAUNCH_PROFILES[self.profile]["concurrency"])
 
     async def start(self):
         await self._ensure_lock()
@@ -33,14 +115,31 @@ class ZeturfScraper:
             if self.browser:
                 return
 
+            profile = LAUNCH_PROFILES[self.profile]
             self.playwright = await async_playwright().start()
-            # Launch browser (headless by default)
-            self.browser = await self.playwright.chromium.launch(headless=True)
-            self.context = await self.browser.new_context()
+            try:
+                # Launch browser (headless by default)
+                self.browser = await self.playwright.chromium.launch(headless=True, args=profile["args"])
+                self.context = await self.browser.new_context(**profile["context"])
+                if self.asset_cache:
+                    await self.context.route("**/*", self._serve_asset)
+            except Exception:
+                # Don't leave a driver process behind for every failed launch
+                if self.browser:
+                    try:
+                        await self.browser.close()
+                    except Exception:
+                        pass
+                await self.playwright.stop()
+                self.playwright = self.browser = self.context = None
+                raise
+            print(f"Browser started ({self.profile} profile)")
 
     async def stop(self):
         await self._ensure_lock()
         async with self._lock:
+            # Closed along with the context
+            self._warm_pages.clear()
             if self.context:
                 await self.context.close()
                 self.context = None
@@ -52,29 +151,152 @@ class ZeturfScraper:
                 self.playwright = None
 
     async def restart(self):
+        self.restarts += 1
         await self.stop()
         await self.start()
 
-    async def get_new_page(self):
+    async def get_new_page(self, url: str = None):
+        """A new page, or a pre-navigated one from warm_up() if `url` was warmed."""
+        if url:
+            warming = self._warming.get(url.rstrip("/"))
+            if warming:
+                # Still navigating: wait for it rather than open a cold page
+                await asyncio.shield(warming)
+        await self._expire_warm_pages()
+        if url:
+            warm = self._warm_pages.pop(url.rstrip("/"), None)
+            if warm and not warm[1].is_closed():
+                return warm[1]
         if not self.context:
             await self.start()
         try:
             page = await self.context.new_page()
             # Block unnecessary resources
-            await page.route("**/*", lambda route: route.abort() 
-                if route.request.resource_type in ["image", "media", "font", "stylesheet"] 
-                else route.continue_())
+            await page.route("**/*", self._block_resources)
             return page
         except Exception:
             print("Context failed, restarting browser...")
             await self.restart()
             page = await self.context.new_page()
-            await page.route("**/*", lambda route: route.abort() 
-                if route.request.resource_type in ["image", "media", "font", "stylesheet"] 
-                else route.continue_())
+            await page.route("**/*", self._block_resources)
             return page
 
-    async def scrape_race(self, url: str, page=None):
+    @staticmethod
+    async def _block_resources(route):
+        if route.request.resource_type in BLOCKED_TYPES:
+            await route.abort()
+        else:
+            # On to the context's asset cache handler, if any (else the network)
+            await route.fallback()
+
+    async def _serve_asset(self, route):
+        """Context route handler: static assets from the disk cache, storing cacheable misses."""
+        request = route.request
+        if request.method != "GET" or request.resource_type not in CACHEABLE_TYPES:
+            await route.fallback()
+            return
+        cached = await asyncio.to_thread(self.asset_cache.get, request.url)
+        if cached:
+            status, headers, body = cached
+            await route.fulfill(status=status, headers=headers, body=body)
+            return
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception:
+            await route.fallback()
+            return
+        ttl = cache_ttl(request.url, response.status, response.headers)
+        if ttl:
+            await asyncio.to_thread(self.asset_cache.put, request.url, response.status, response.headers, body, ttl)
+        await route.fulfill(response=response, body=body)
+
+    async def warm_up(self, urls: list[str]):
+        """
+        Open and navigate pages for races that are about to be monitored, all
+        at once, so their first tick only has to read the table. At most
+        MAX_WARM_PAGES are kept; unused ones are closed once older than
+        WARM_PAGE_TTL, checked on every warm_up() and get_new_page().
+        """
+        await self._ensure_lock()
+        # Registered before anything awaits, so a monitor task started right
+        # after this call finds the warm-up in flight and waits for it
+        pending = [u for u in dict.fromkeys(urls)
+                   if u.rstrip("/") not in self._warm_pages and u.rstrip("/") not in self._warming]
+        pending = pending[:max(0, MAX_WARM_PAGES - len(self._warm_pages) - len(self._warming))]
+        tasks = []
+        for url in pending:
+            key = url.rstrip("/")
+            task = asyncio.ensure_future(self._warm(url))
+            self._warming[key] = task
+            task.add_done_callback(lambda _, key=key: self._warming.pop(key, None))
+            tasks.append(task)
+        await self._expire_warm_pages()
+        await asyncio.gather(*tasks)
+
+    async def _warm(self, url: str):
+        async with self._sem:
+            page = None
+            try:
+                page = await self.get_new_page()
+                await page.goto(url, wait_until="domcontentloaded", timeout=20000)
+                self._warm_pages[url.rstrip("/")] = (time.monotonic(), page)
+            except Exception as e:
+                print(f"Warm-up failed for {url}: {e}")
+                if page:
+                    await page.close()
+
+    async def _expire_warm_pages(self):
+        now = time.monotonic()
+        for key, (ts, page) in list(self._warm_pages.items()):
+            if now - ts > WARM_PAGE_TTL:
+                del self._warm_pages[key]
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+
+    async def scrape_race(self, url: str, page=None, max_age: float = None):
+        """
+        Scrape a race page. Concurrent calls for the same URL share one
+        in-flight scrape (the first caller's page is used). With `max_age`,
+        a result that finished less than that many seconds ago is returned
+        without touching the browser. At most the profile's `concurrency`
+        scrapes drive pages at once; the rest wait their turn.
+        """
+        await self._ensure_lock()
+        key = url.rstrip("/")
+        if max_age is not None:
+            recent = self._recent.get(key)
+            if recent and time.monotonic() - recent[0] <= max_age:
+                self.reused += 1
+                return recent[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._bounded(self._scrape_race(url, page)))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish_scrape(key, t))
+        # Shielded so one caller giving up doesn't cancel the scrape for the others
+        return await asyncio.shield(task)
+
+    async def _bounded(self, coro):
+        async with self._sem:
+            return await coro
+
+    def _finish_scrape(self, key, task):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() or not task.result():
+            return
+        now = time.monotonic()
+        self._recent[key] = (now, task.result())
+        # Drop results nobody could still ask for
+        for stale_key in [k for k, (ts, _) in self._recent.items() if now - ts > 60]:
+            del self._recent[stale_key]
+
+    async def _scrape_race(self, url: str, page=None):
         if not self.context:
             await self.start()
         
@@ -82,6 +304,9 @@ class ZeturfScraper:
         if not page:
             page = await self.context.new_page()
             should_close = True
+        # Seconds spent per phase, returned with the result for benchmarks/metrics
+        timings = {}
+        phase_start = time.perf_counter()
         try:
             current_url = page.url
             is_same_page = (current_url == url or current_url == url + "/")
@@ -93,6 +318,8 @@ class ZeturfScraper:
                     if await refresh_btn.is_enabled():
                         # print(f"Refreshing odds via button for {url}...")
                         await refresh_btn.click()
+                        timings["refresh"] = time.perf_counter() - phase_start
+                        phase_start = time.perf_counter()
                         # Small wait for AJAX update to apply to DOM
                         await asyncio.sleep(1.5)
                     else:
@@ -122,6 +349,9 @@ class ZeturfScraper:
                      print(f"Selector timeout. Page HTML preview: {html_content[:500]}")
                      raise e
 
+            timings["refresh_wait" if is_same_page else "navigate"] = time.perf_counter() - phase_start
+            phase_start = time.perf_counter()
+
             # Get race title and time
             title_locator = page.locator("h1")
             race_title = "Unknown Race"
@@ -213,7 +443,7 @@ class ZeturfScraper:
                         if href:
                             # Ensure full URL
                             if href.startswith("/"):
-                                next_race_url = f"https://www.zeturf.com{href}"
+                                next_race_url = f"{BASE_URL}{href}"
                             else:
                                 next_race_url = href
             except Exception as e:
@@ -324,13 +554,18 @@ class ZeturfScraper:
                     "is_non_runner": is_non_runner
                 })
 
+            timings["extract"] = time.perf_counter() - phase_start
+
             return {
                 "title": race_title, 
                 "runners": runners_data, 
                 "time_str": race_time_str, 
                 "next_race_url": next_race_url,
                 "next_update_seconds": next_update_seconds,
-                "timestamp": race_timestamp
+                "timestamp": race_timestamp,
+                "scraped_at": time.time(),
+                "page_url": page.url,
+                "timings": timings
             }
             
         except Exception as e:
@@ -351,79 +586,20 @@ class ZeturfScraper:
         if not self.context:
             await self.start()
         
-        if not self.context:
-            await self.start()
-        
         page = await self.context.new_page()
         should_close = True # Always close since we created it
         race_urls = []
         try:
-            # URL for specific date - Using RESULTS page
-            url = f"https://www.zeturf.com/en/resultats-et-rapports-du-jour/{date_str}"
-            await page.goto(url, wait_until="domcontentloaded")
-            
-            # Wait for content - meeting links
-            try:
-                await page.wait_for_selector("a[href*='/reunion-du-jour/']", timeout=10000)
-            except:
-                print("Timeout waiting for meeting links.")
-                return []
-
-            # Get all meeting links
-            meeting_links = await page.locator("a[href*='/reunion-du-jour/']").all()
-            meeting_urls = []
-            for link in meeting_links:
-                href = await link.get_attribute("href")
-                if href:
-                    full_url = f"https://www.zeturf.com{href}" if href.startswith("/") else href
-                    if full_url not in meeting_urls:
-                        meeting_urls.append(full_url)
-            
+            meeting_urls = await self._scrape_meeting_urls(page, date_str)
             print(f"Found {len(meeting_urls)} meetings. Filtering for France Trotting...")
             
             # Visit each meeting to check details
             for m_url in meeting_urls:
                 try:
-                    await page.goto(m_url, wait_until="domcontentloaded")
-                    
-                    # 1. Check for Country: "France"
-                    # Look for the flag icon or text "France" in specific headers to be sure
-                    # The flag class is usually "fi fi-fr"
-                    content_content = await page.content()
-                    is_france = "fi-fr" in content_content or "FRANCE" in await page.locator(".numero-reunion-wrapper").text_content() if await page.locator(".numero-reunion-wrapper").count() > 0 else False
-                    
-                    if not is_france:
-                        # Double check with another selector if unsure, but strict is better for now
-                        # Attempt to find "France" in the main header
-                        header_text = await page.locator("h1.nom-reunion").text_content() if await page.locator("h1.nom-reunion").count() > 0 else ""
-                        if "FRANCE" not in header_text.upper() and "fi-fr" not in content_content:
-                            # print(f"Skipping non-French meeting: {m_url}")
-                            continue
-
-                    # 2. Iterate over race rows to filtering Mixed Meetings
-                    # Select only rows that have the Trotting or Monte icon
-                    # Rows are tr.item
-                    race_rows = await page.locator("tr.item").all()
-                    
-                    for row in race_rows:
-                        # Check discipline icon within this row
-                        # .zt-trot (Harness) or .zt-monte (Mounted)
-                        # Avoid .zt-run (Flat) or others
-                        is_trot = await row.locator(".zt-trot").count() > 0
-                        is_monte = await row.locator(".zt-monte").count() > 0
-                        
-                        if is_trot or is_monte:
-                            # Get the link
-                            link_element = row.locator("td.nom a").first
-                            if await link_element.count() > 0:
-                                href = await link_element.get_attribute("href")
-                                if href:
-                                    full_r_url = f"https://www.zeturf.com{href}" if href.startswith("/") else href
-                                    if full_r_url not in race_urls:
-                                        print(f"Found French Trotting Race: {full_r_url}")
-                                        race_urls.append(full_r_url)
-                        # else:
-                        #     print(f"Skipping non-trotting race row in {m_url}")
+                    for full_r_url in await self._scrape_meeting_races(page, m_url, france_only=True):
+                        if full_r_url not in race_urls:
+                            print(f"Found French Trotting Race: {full_r_url}")
+                            race_urls.append(full_r_url)
 
                 except Exception as e:
                     print(f"Error checking meeting {m_url}: {e}")
@@ -438,6 +614,163 @@ class ZeturfScraper:
             if should_close:
                 await page.close()
 
+    async def scrape_program_meetings(self, date_str: str) -> list[str]:
+        """Meeting URLs listed for a date (no meeting pages visited)."""
+        if not self.context:
+            await self.start()
+
+        page = await self.context.new_page()
+        try:
+            return await self._scrape_meeting_urls(page, date_str)
+        except Exception as e:
+            print(f"Error scraping program: {e}")
+            return []
+        finally:
+            await page.close()
+
+    async def _scrape_meeting_urls(self, page, date_str: str) -> list[str]:
+        # URL for specific date - Using RESULTS page
+        url = f"{BASE_URL}/en/resultats-et-rapports-du-jour/{date_str}"
+        await page.goto(url, wait_until="domcontentloaded")
+        
+        # Wait for content - meeting links
+        try:
+            await page.wait_for_selector("a[href*='/reunion-du-jour/']", timeout=10000)
+        except:
+            print("Timeout waiting for meeting links.")
+            return []
+
+        # Get all meeting links
+        meeting_links = await page.locator("a[href*='/reunion-du-jour/']").all()
+        meeting_urls = []
+        for link in meeting_links:
+            href = await link.get_attribute("href")
+            if href:
+                full_url = f"{BASE_URL}{href}" if href.startswith("/") else href
+                if full_url not in meeting_urls:
+                    meeting_urls.append(full_url)
+        return meeting_urls
+
+    async def scrape_meeting(self, meeting_url: str) -> list[str]:
+        """Trotting race URLs of a single meeting, in card order."""
+        card = await self.scrape_meeting_card(meeting_url)
+        return [race["url"] for race in card["races"]] if card else []
+
+    async def scrape_meeting_card(self, meeting_url: str):
+        """
+        A meeting's trotting card: {"name", "number", "is_france", "races"},
+        each race {"url", "name", "race_number", "discipline", "post_time"}
+        ("HHhMM" as shown, or None). None if the page couldn't be read.
+        """
+        if not self.context:
+            await self.start()
+
+        page = await self.context.new_page()
+        try:
+            return await self._scrape_meeting_card(page, meeting_url)
+        except Exception as e:
+            print(f"Error scraping meeting {meeting_url}: {e}")
+            return None
+        finally:
+            await page.close()
+
+    async def _scrape_meeting_races(self, page, m_url: str, france_only: bool) -> list[str]:
+        card = await self._scrape_meeting_card(page, m_url)
+        if france_only and not card["is_france"]:
+            # print(f"Skipping non-French meeting: {m_url}")
+            return []
+        return [race["url"] for race in card["races"]]
+
+    async def _scrape_meeting_card(self, page, m_url: str) -> dict:
+        await page.goto(m_url, wait_until="domcontentloaded")
+        
+        # 1. Check for Country: "France"
+        # Look for the flag icon or text "France" in specific headers to be sure
+        # The flag class is usually "fi fi-fr"
+        content_content = await page.content()
+        is_france = "fi-fr" in content_content or "FRANCE" in await page.locator(".numero-reunion-wrapper").text_content() if await page.locator(".numero-reunion-wrapper").count() > 0 else False
+        
+        # Double check with another selector if unsure, but strict is better for now
+        # Attempt to find "France" in the main header
+        header_text = await page.locator("h1.nom-reunion").text_content() if await page.locator("h1.nom-reunion").count() > 0 else ""
+        if not is_france:
+            is_france = "FRANCE" in header_text.upper() or "fi-fr" in content_content
+
+        meeting_match = re.search(r"/R(\d+)-", m_url)
+
+        # 2. Iterate over race rows to filtering Mixed Meetings
+        # Select only rows that have the Trotting or Monte icon
+        # Rows are tr.item
+        races = []
+        race_rows = await page.locator("tr.item").all()
+        
+        for row in race_rows:
+            # Check discipline icon within this row
+            # .zt-trot (Harness) or .zt-monte (Mounted)
+            # Avoid .zt-run (Flat) or others
+            is_trot = await row.locator(".zt-trot").count() > 0
+            is_monte = await row.locator(".zt-monte").count() > 0
+            
+            if is_trot or is_monte:
+                # Get the link
+                link_element = row.locator("td.nom a").first
+                if await link_element.count() > 0:
+                    href = await link_element.get_attribute("href")
+                    if href:
+                        full_r_url = f"{BASE_URL}{href}" if href.startswith("/") else href
+                        if any(race["url"] == full_r_url for race in races):
+                            continue
+                        race_match = re.search(r"R\d+C(\d+)", href)
+                        time_match = re.search(r"\b(\d{1,2})[h:](\d{2})\b", await row.text_content() or "")
+                        races.append({
+                            "url": full_r_url,
+                            "name": (await link_element.text_content() or "").strip(),
+                            "race_number": int(race_match.group(1)) if race_match else None,
+                            "discipline": "trot" if is_trot else "monte",
+                            "post_time": f"{int(time_match.group(1)):02d}h{time_match.group(2)}" if time_match else None,
+                        })
+            # else:
+            #     print(f"Skipping non-trotting race row in {m_url}")
+        return {
+            "name": " ".join(header_text.split()) or None,
+            "number": int(meeting_match.group(1)) if meeting_match else None,
+            "is_france": bool(is_france),
+            "races": races,
+        }
+
+    async def scrape_results(self, urls: list[str]) -> dict:
+        """
+        Results of several races read one after another on a single page
+        (a meeting's pending races): {url: (winner_name, final_odds)},
+        winner_name None where no result is posted yet.
+        """
+        if not self.context:
+            await self.start()
+
+        async with self._sem:
+            page = await self.context.new_page()
+            try:
+                return {url: await self.scrape_race_result(url, page=page) for url in urls}
+            finally:
+                await page.close()
+
+    async def _winner_odds(self, page, winner_name: str) -> float:
+        """The winner's final price from the runners table (0.0 if not shown)."""
+        for row in await page.locator("tr").all():
+            name_locator = row.locator("a.horse-name")
+            if await name_locator.count() == 0:
+                continue
+            if (await name_locator.first.text_content() or "").strip() != winner_name:
+                continue
+            odds_locator = row.locator("td.cote")
+            if await odds_locator.count() == 0:
+                return 0.0
+            try:
+                return float((await odds_locator.first.text_content()).strip().replace(',', '.'))
+            except ValueError:
+                return 0.0
+        return 0.0
+
     async def scrape_race_result(self, url: str, page=None):
         if not self.context:
             await self.start()
@@ -462,7 +795,7 @@ class ZeturfScraper:
             winner_name = await name_el.text_content()
             winner_name = winner_name.strip()
             
-            return winner_name, 0.0
+            return winner_name, await self._winner_odds(page, winner_name)
 
         except Exception as e:
             print(f"Error scraping result {url}: {e}")
@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+
+import requests
+
+PMU_SILKS_URL = "https://www.pmu.fr/back-assets/hippique/casaques/"
+# What /silks/ accepts: <DDMMYYYY>/R<meeting>/C<race>/P<runner>.png, so the
+# proxy can't be pointed anywhere else on pmu.fr
+SILK_PATH = re.compile(r"^\d{8}/R\d{1,2}/C\d{1,2}/P\d{1,2}\.png$")
+# A silk PMU doesn't have (yet) is asked for again after this long
+MISSING_TTL = 600
+FETCH_TIMEOUT = 10
+PREFETCH_CONCURRENCY = 4
+
+# Use persistent path on Fly.io, local path otherwise
+if os.environ.get("FLY_APP_NAME"):
+    SILK_CACHE_DIR = "/app/data/silks"
+else:
+    SILK_CACHE_DIR = os.environ.get("SILK_CACHE_DIR", "silk-cache")
+SILK_CACHE_MB = int(os.environ.get("SILK_CACHE_MB", "32"))
+
+
+def silk_path(url: str):
+    """The /silks/ path for a PMU silk URL, or None if it isn't one."""
+    if not url or not url.startswith(PMU_SILKS_URL):
+        return None
+    path = url[len(PMU_SILKS_URL):]
+    return path if SILK_PATH.match(path) else None
+
+
+class SilkCache:
+    """
+    Content-addressed disk cache of PMU silk images. Blobs are stored once
+    under their SHA-256 (runners of the same owner share a silk across
+    races); an index maps silk paths to blobs. Least recently used paths are
+    dropped, and unreferenced blobs deleted, to stay under `max_bytes`.
+    Concurrent requests for the same silk share one download.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index = OrderedDict()  # silk path -> digest, least recently used first
+        self.blobs = {}  # digest -> size
+        self.missing = {}  # silk path -> monotonic time PMU said 404
+        self.inflight = {}  # silk path -> Future
+        self.hits = 0
+        self.misses = 0
+        self.fetch_errors = 0
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+        self._load()
+
+    @property
+    def size(self) -> int:
+        return sum(self.blobs.values())
+
+    def _index_file(self) -> str:
+        return os.path.join(self.directory, "index.json")
+
+    def _blob_file(self, digest: str) -> str:
+        return os.path.join(self.directory, "blobs", digest + ".png")
+
+    def _load(self):
+        for name in os.listdir(os.path.join(self.directory, "blobs")):
+            if name.endswith(".png"):
+                self.blobs[name[:-4]] = os.path.getsize(self._blob_file(name[:-4]))
+        try:
+            with open(self._index_file()) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = []
+        for path, digest in saved:
+            if digest in self.blobs:
+                self.index[path] = digest
+
+    def _write_index(self, items: list):
+        # Blocking: run in a thread
+        self._write_atomic(self._index_file(), json.dumps(items).encode())
+
+    def _write_atomic(self, target: str, data: bytes):
+        # Unique temp name: two downloads may finish at the same time
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, target)
+
+    async def get(self, path: str):
+        """(digest, PNG bytes) for a silk path, downloading it on first use; None if PMU has none."""
+        digest = self.index.get(path)
+        if digest:
+            try:
+                body = await asyncio.to_thread(self._read_blob, digest)
+                self.index.move_to_end(path)
+                self.hits += 1
+                return digest, body
+            except OSError:
+                self.index.pop(path, None)
+
+        missing_at = self.missing.get(path)
+        if missing_at and time.monotonic() - missing_at < MISSING_TTL:
+            return None
+
+        future = self.inflight.get(path)
+        if future is None:
+            self.misses += 1
+            future = asyncio.ensure_future(self._download(path))
+            self.inflight[path] = future
+            future.add_done_callback(lambda _: self.inflight.pop(path, None))
+        return await asyncio.shield(future)
+
+    def _read_blob(self, digest: str) -> bytes:
+        with open(self._blob_file(digest), "rb") as f:
+            return f.read()
+
+    async def _download(self, path: str):
+        try:
+            response = await asyncio.to_thread(requests.get, PMU_SILKS_URL + path, timeout=FETCH_TIMEOUT)
+        except requests.RequestException as e:
+            print(f"Silk fetch failed for {path}: {e}")
+            self.fetch_errors += 1
+            return None
+        if response.status_code != 200 or not response.headers.get("content-type", "").startswith("image/"):
+            # Not published yet, or an error page: don't ask again for a while
+            self.missing[path] = time.monotonic()
+            return None
+        self.missing.pop(path, None)
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        if digest not in self.blobs:
+            await asyncio.to_thread(self._write_atomic, self._blob_file(digest), body)
+            self.blobs[digest] = len(body)
+        # Index bookkeeping stays on the event loop; only file IO goes to threads
+        self.index[path] = digest
+        self.index.move_to_end(path)
+        self._evict()
+        await asyncio.to_thread(self._write_index, list(self.index.items()))
+        return digest, body
+
+    def _evict(self):
+        while self.size > self.max_bytes and len(self.index) > 1:
+            _, digest = self.index.popitem(last=False)
+            if digest not in self.index.values():
+                self.blobs.pop(digest, None)
+                try:
+                    os.remove(self._blob_file(digest))
+                except OSError:
+                    pass
+
+    async def prefetch(self, paths):
+        """Download silks not cached yet (e.g. for a race that just started being monitored)."""
+        pending = [p for p in dict.fromkeys(paths) if p and p not in self.index]
+        if not pending:
+            return
+        semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+
+        async def fetch(path):
+            async with semaphore:
+                await self.get(path)
+
+        await asyncio.gather(*(fetch(path) for path in pending))
+        print(f"Prefetched {len(pending)} silk(s)")
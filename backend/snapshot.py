@@ -0,0 +1,88 @@
+import gzip
+import json
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+from models import Runner
+
+RUNNER_FIELDS = list(Runner.__table__.columns.keys())
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+def runner_dict(runner, fields=None) -> dict:
+    # Plain column read: much cheaper than pydantic/jsonable_encoder per runner
+    return {field: getattr(runner, field) for field in (fields or RUNNER_FIELDS)}
+
+
+def _default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    if orjson:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+
+def pick_encoding(accept_encoding: str) -> str:
+    accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").lower().split(",")}
+    if brotli and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+class SnapshotCache:
+    """
+    Encoded response bodies for one data version.
+    Each view (the plain board, or a filtered query keyed by its parameters)
+    is built and encoded once per version; compressed variants are produced
+    on first request and then served as-is to every client.
+    """
+
+    def __init__(self, max_views: int = 64):
+        self.max_views = max_views
+        self.version = None
+        self._views = {}  # key -> (meta, {encoding: body})
+
+    def get(self, version: int, build, encoding: str = "identity", key=None):
+        """
+        Return (body, encoding, meta) for `version`. `build()` returns
+        (payload, meta) and is only called on a miss; meta is any extra
+        value the caller wants cached with the body (e.g. a page cursor).
+        """
+        if version != self.version:
+            self._views = {}
+            self.version = version
+
+        if key not in self._views:
+            if len(self._views) >= self.max_views:
+                self._views.clear()
+            payload, meta = build()
+            self._views[key] = (meta, {"identity": dumps(payload)})
+
+        meta, bodies = self._views[key]
+        body = bodies["identity"]
+        if encoding == "identity" or len(body) < MIN_COMPRESS_BYTES:
+            return body, "identity", meta
+
+        if encoding not in bodies:
+            if encoding == "br":
+                bodies["br"] = brotli.compress(body, quality=5)
+            else:
+                bodies["gzip"] = gzip.compress(body, compresslevel=6)
+        return bodies[encoding], encoding, meta
@@ -0,0 +1,301 @@
+"""
+Benchmark the tick pipeline against local fixtures (no live site needed).
+
+    python benchmark.py --races 1,4,8 --runners 8,14,20 --iterations 30
+    python benchmark.py --no-browser --compare benchmark_results/<previous>.json
+    python benchmark.py --profiles low-memory,balanced,throughput --races 8 --runners 14
+
+For every (races, runners) combination a fixture_server.py market is started
+and each phase is timed separately:
+  navigate      first page load of each race page        (browser)
+  refresh       #update-cotes-btn click on a loaded page (browser)
+  refresh_wait  the fixed wait for the AJAX update       (browser)
+  extract       reading title/time/runners from the DOM  (browser)
+  save          save_race_data for one race              (database)
+  commit        commit_changes for one race              (database)
+  races_query / races_encode   building and encoding the /races board
+Browser phases run once per Chromium launch profile (--profiles, see
+scraper.LAUNCH_PROFILES), which also reports the browser's memory (PSS of
+the Chromium process tree, RSS where PSS is unavailable) and its growth per
+open race page. Reports p50/p95/p99 per phase plus RSS (and, with
+--trace-memory, the Python heap peak of the database phases), and writes the
+results tagged with the git commit as JSON so runs can be compared.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import fixture_server
+
+FIXTURE_PORT = 8766
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_results")
+
+
+def percentiles(samples) -> dict:
+    samples = sorted(samples)
+    if not samples:
+        return {"n": 0}
+    pick = lambda pct: samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+    return {
+        "n": len(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "p50_ms": round(pick(50) * 1000, 3),
+        "p95_ms": round(pick(95) * 1000, 3),
+        "p99_ms": round(pick(99) * 1000, 3),
+    }
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # macOS reports bytes, Linux kilobytes; this is the peak, not current
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def process_mb(pid: int) -> float:
+    """PSS of one process (shared pages split between sharers), else RSS."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return 0.0
+
+
+def browser_mb() -> float:
+    """Memory of every process descended from this one (Playwright driver and Chromium)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    total, pending = 0.0, list(children.get(os.getpid(), []))
+    while pending:
+        pid = pending.pop()
+        total += process_mb(pid)
+        pending.extend(children.get(pid, []))
+    return total
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except Exception:
+        return "unknown"
+
+
+async def browser_phases(fixture, base_url: str, iterations: int, profile: str) -> tuple:
+    from scraper import ZeturfScraper
+
+    samples = {"navigate": [], "refresh": [], "refresh_wait": [], "extract": []}
+    memory = {}
+    scraper = ZeturfScraper(profile=profile)
+    await scraper.start()
+    try:
+        urls = [base_url + fixture.race_path(key) for key in fixture.markets]
+        memory["browser_idle_mb"] = round(browser_mb(), 1)
+        pages = [await scraper.context.new_page() for _ in urls]
+
+        async def tick():
+            results = await asyncio.gather(*(scraper.scrape_race(url, page=page) for url, page in zip(urls, pages)))
+            for result in results:
+                for phase, seconds in (result or {}).get("timings", {}).items():
+                    samples[phase].append(seconds)
+
+        await tick()  # First pass navigates
+        for _ in range(iterations):
+            await tick()
+            # Let the next publish land so the refresh button is enabled again
+            await asyncio.sleep(fixture_ttl(fixture))
+        memory["browser_mb"] = round(browser_mb(), 1)
+        memory["mb_per_page"] = round((memory["browser_mb"] - memory["browser_idle_mb"]) / len(pages), 1)
+    finally:
+        await scraper.stop()
+    return samples, memory
+
+
+def fixture_ttl(fixture) -> float:
+    return next(iter(fixture.markets.values())).ttl
+
+
+def database_phases(main, fixture, iterations: int) -> dict:
+    from sqlmodel import Session, SQLModel
+    from database import engine
+    from changes import commit_changes
+    from models import Race
+    from snapshot import dumps
+
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    main.steam_analytics.forget(list(main.steam_analytics.buffers))
+
+    samples = {"save": [], "commit": [], "races_query": [], "races_encode": []}
+    with Session(engine) as session:
+        race_ids = {}
+        for key in fixture.markets:
+            race = Race(url=fixture.race_path(key), name="Wait for scrape...", meeting="Fixture")
+            session.add(race)
+            session.flush()
+            race_ids[key] = race.id
+        session.commit()
+
+    for _ in range(iterations):
+        for key, market in fixture.markets.items():
+            market.advance(time.time())
+            result = market.scrape_result()
+            with Session(engine) as session:
+                race = session.get(Race, race_ids[key])
+                started = time.perf_counter()
+                main.save_race_data(session, race, result)
+                saved = time.perf_counter()
+                commit_changes(session)
+                samples["save"].append(saved - started)
+                samples["commit"].append(time.perf_counter() - saved)
+
+        started = time.perf_counter()
+        races, _ = main._load_races_payload()
+        built = time.perf_counter()
+        dumps(races)
+        samples["races_query"].append(built - started)
+        samples["races_encode"].append(time.perf_counter() - built)
+    return samples
+
+
+def run(args) -> dict:
+    base_url = f"http://127.0.0.1:{FIXTURE_PORT}"
+    # The backend reads these at import: fixture site root, database in a temp dir
+    os.environ["ZETURF_BASE_URL"] = base_url
+    os.environ.pop("FLY_APP_NAME", None)
+    os.chdir(tempfile.mkdtemp(prefix="bench-"))
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+
+    results = []
+    profiles = [None] if args.no_browser else args.profiles
+    for profile, races, runners in itertools.product(profiles, args.races, args.runners):
+        fixture = fixture_server.Fixture(meetings=1, races=races, runners=runners, ttl=args.ttl,
+                                         first_off=3600, interval=600, result_delay=600)
+        server = fixture_server.serve(fixture, port=FIXTURE_PORT)
+        try:
+            samples, memory = {}, {}
+            if profile:
+                browser_samples, memory = asyncio.run(browser_phases(fixture, base_url, args.iterations, profile))
+                samples.update(browser_samples)
+            # tracemalloc slows allocation-heavy code, so heap tracing is opt-in
+            if args.trace_memory:
+                tracemalloc.start()
+            with contextlib.redirect_stdout(io.StringIO()):  # Alert prints
+                samples.update(database_phases(main, fixture, args.iterations))
+            py_peak = None
+            if args.trace_memory:
+                py_peak = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+                tracemalloc.stop()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        row = {
+            "profile": profile,
+            "races": races,
+            "runners": runners,
+            "phases": {phase: percentiles(values) for phase, values in samples.items()},
+            "rss_mb": round(rss_mb(), 1),
+            "py_peak_mb": py_peak,
+            **memory,
+        }
+        results.append(row)
+        print_row(row)
+    return {
+        "commit": git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "iterations": args.iterations,
+        "browser": not args.no_browser,
+        "results": results,
+    }
+
+
+def print_row(row: dict):
+    heap = f", heap peak {row['py_peak_mb']} MB" if row["py_peak_mb"] is not None else ""
+    browser = ""
+    if row["profile"]:
+        browser = f", {row['profile']} browser {row['browser_mb']} MB, {row['mb_per_page']} MB/page"
+    print(f"\n{row['races']} races x {row['runners']} runners  (RSS {row['rss_mb']} MB{heap}{browser})")
+    print(f"  {'phase':<14}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for phase, stats in row["phases"].items():
+        if stats["n"]:
+            print(f"  {phase:<14}{stats['n']:>6}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
+def compare(report: dict, previous_path: str):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    before = {(r.get("profile"), r["races"], r["runners"]): r["phases"] for r in previous["results"]}
+    print(f"\nvs {previous['commit']} ({previous['date']}), p50 / p95 change:")
+    for row in report["results"]:
+        old = before.get((row["profile"], row["races"], row["runners"]))
+        if not old:
+            continue
+        for phase, stats in row["phases"].items():
+            if stats["n"] and old.get(phase, {}).get("n"):
+                delta = lambda key: (stats[key] - old[phase][key]) / old[phase][key] * 100 if old[phase][key] else 0.0
+                print(f"  {row['races']}x{row['runners']} {phase:<14}{delta('p50_ms'):>+8.1f}%{delta('p95_ms'):>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-phase benchmark of the scrape/save/serve pipeline")
+    int_list = lambda value: [int(v) for v in value.split(",")]
+    parser.add_argument("--races", type=int_list, default=[1, 4, 8], help="Comma-separated race counts")
+    parser.add_argument("--runners", type=int_list, default=[8, 14], help="Comma-separated runners per race")
+    parser.add_argument("--iterations", type=int, default=20, help="Ticks per combination")
+    parser.add_argument("--ttl", type=float, default=1.0, help="Fixture publish interval (seconds)")
+    parser.add_argument("--no-browser", action="store_true", help="Skip the Playwright phases")
+    parser.add_argument("--profiles", type=lambda value: value.split(","), default=["balanced"],
+                        help="Comma-separated Chromium launch profiles to compare (low-memory, balanced, throughput)")
+    parser.add_argument("--trace-memory", action="store_true", help="Record the Python heap peak (slows the database phases)")
+    parser.add_argument("--out", help="Results file (default: benchmark_results/<date>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to diff against")
+    args = parser.parse_args()
+    root = os.getcwd()
+
+    report = run(args)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{report['date'].replace(':', '')}-{report['commit']}.json")
+    out = os.path.join(root, out)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {out}")
+    if args.compare:
+        compare(report, os.path.join(root, args.compare))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+Local stand-in for zeturf.com, for load tests and reproducible benchmarks.
+
+    python fixture_server.py --meetings 4 --races 8 --runners 14 --ttl 10
+    ZETURF_BASE_URL=http://127.0.0.1:8765 uvicorn main:app   (in backend/)
+
+Serves the pages the scraper reads, with the same selectors:
+  /en/resultats-et-rapports-du-jour/<date>   day page linking every meeting
+  /en/reunion-du-jour/<date>/R<m>-<slug>     meeting card (tr.item rows)
+  /en/course/<date>/R<m>C<c>-<slug>          race page (table-runners, td.cote,
+                                             #update-cotes-btn, #dermin-refresh)
+Each race is a simulated pari-mutuel market: new odds are published every
+--ttl seconds (one runner per race is steamed in), #dermin-refresh carries
+the seconds until the next publish, and #update-cotes-btn fetches the latest
+published odds then stays disabled until the next one, like the real site.
+After the off the odds freeze; --result-delay seconds later the race page
+shows table.resultats-table with the winner.
+
+With --pages DIR, recorded HTML under DIR (mirroring the URL path, with a
+.html suffix) is served instead of the generated race page, with its td.cote
+cells rewritten from the simulation and the refresh script injected.
+
+Harness endpoints: /fixture/odds/R<m>C<c> (what the button fetches) and
+/fixture/state (every race's publish history, used by replay_harness.py).
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACKS = ["Vincennes", "Enghien", "Caen", "Cabourg", "Laval", "Cagnes-sur-Mer", "Mauquenchy", "Vichy"]
+SYLLABLES = ["ka", "ro", "mi", "da", "lu", "ne", "vo", "ti", "sa", "be", "gor", "zan", "fi", "qua", "del", "mar"]
+# Pari-mutuel takeout: odds = (1 - TAKEOUT) / share
+TAKEOUT = 0.15
+# Publishes kept per race for /fixture/state
+STATE_HISTORY = 200
+
+REFRESH_SCRIPT = """
+<script>
+(function () {
+  var btn = document.getElementById('update-cotes-btn');
+  if (!btn) return;
+  btn.addEventListener('click', function () {
+    btn.disabled = true;
+    fetch('/fixture/odds/%(key)s').then(function (r) { return r.json(); }).then(function (data) {
+      var cells = document.querySelectorAll('td.cote');
+      data.odds.forEach(function (odds, i) { if (cells[i]) cells[i].textContent = odds; });
+      var ttl = document.getElementById('dermin-refresh');
+      if (ttl) ttl.setAttribute('data-ttl', String(data.next_in));
+      setTimeout(function () { btn.disabled = false; }, data.next_in * 1000);
+    }).catch(function () { btn.disabled = false; });
+  });
+})();
+</script>
+"""
+
+
+def _name(rng) -> str:
+    return " ".join("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).upper() for _ in range(2))
+
+
+class Market:
+    """One simulated race: runners, a share random walk, and its publishes."""
+
+    def __init__(self, meeting: int, race: int, runners: int, start: float, off: float, ttl: float, seed: int):
+        self.meeting, self.race = meeting, race
+        self.key = f"R{meeting}C{race}"
+        self.off = off
+        self.ttl = ttl
+        self.rng = random.Random(seed)
+        self.runners = []
+        for number in range(1, runners + 1):
+            self.runners.append({
+                "number": number,
+                "name": _name(self.rng),
+                "jockey": _name(self.rng).title(),
+                "red_shoes": self.rng.choice([0, 0, 0, 1, 2]),
+                "non_runner": self.rng.random() < 0.04,
+            })
+        self.steamer = self.rng.randrange(runners)
+        self.shares = [self.rng.uniform(0.5, 3.0) for _ in range(runners)]
+        self.winner = None
+        self.publishes = deque(maxlen=STATE_HISTORY)  # (published_at, odds list)
+        self.lock = threading.Lock()
+        self._publish(min(start, off))
+
+    def _publish(self, at: float):
+        total = sum(s for s, r in zip(self.shares, self.runners) if not r["non_runner"])
+        odds = []
+        for share, runner in zip(self.shares, self.runners):
+            if runner["non_runner"]:
+                odds.append(None)
+            else:
+                odds.append(max(1.1, round((1 - TAKEOUT) * total / share, 1)))
+        self.publishes.append((at, odds))
+
+    def _step(self):
+        for i in range(len(self.shares)):
+            self.shares[i] *= math.exp(self.rng.gauss(0, 0.04))
+        # Money keeps coming for one horse
+        self.shares[self.steamer] *= 1.035
+
+    def current(self, now: float):
+        """Latest published odds as of `now` and seconds until the next publish."""
+        with self.lock:
+            last_at = self.publishes[-1][0]
+            while last_at + self.ttl <= min(now, self.off):
+                last_at += self.ttl
+                self._step()
+                self._publish(last_at)
+            if now >= self.off:
+                return self.publishes[-1][1], 0
+            return self.publishes[-1][1], max(1, math.ceil(last_at + self.ttl - now))
+
+    def advance(self, now: float):
+        """Publish the next odds immediately (for feeds that drive the market themselves)."""
+        with self.lock:
+            self._step()
+            self._publish(now)
+
+    def scrape_result(self) -> dict:
+        """The latest publish in the shape ZeturfScraper.scrape_race returns."""
+        odds = self.publishes[-1][1]
+        return {
+            "title": f"{self.key} - {TRACKS[(self.meeting - 1) % len(TRACKS)]} - Prix Fixture",
+            "time_str": None,
+            "timestamp": int(self.off),
+            "next_race_url": None,
+            "next_update_seconds": self.ttl,
+            "runners": [{
+                "name": r["name"], "number": r["number"], "odds": price or 0.0,
+                "is_d4": r["red_shoes"] >= 2, "shoeing_status": "D4" if r["red_shoes"] >= 2 else ("DA/DP" if r["red_shoes"] else ""),
+                "jockey": r["jockey"], "silk_url": None, "is_non_runner": r["non_runner"],
+            } for r, price in zip(self.runners, odds)],
+        }
+
+    def result(self, now: float, delay: float):
+        if now < self.off + delay:
+            return None
+        if self.winner is None:
+            self.current(now)
+            runners = [r for r in self.runners if not r["non_runner"]]
+            weights = [s for s, r in zip(self.shares, self.runners) if not r["non_runner"]]
+            self.winner = self.rng.choices(runners, weights)[0]["name"]
+        return self.winner
+
+
+class Fixture:
+    def __init__(self, meetings: int, races: int, runners: int, ttl: float, first_off: float,
+                 interval: float, result_delay: float, pages_dir: str = None, seed: int = 1):
+        now = time.time()
+        self.date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        self.result_delay = result_delay
+        self.pages_dir = pages_dir
+        self.markets = {}
+        for m in range(1, meetings + 1):
+            for c in range(1, races + 1):
+                # Meetings run side by side; races within a meeting every `interval`
+                off = now + first_off + (c - 1) * interval + (m - 1) * 60
+                self.markets[f"R{m}C{c}"] = Market(m, c, runners, now, off, ttl, seed * 1000 + m * 100 + c)
+        self.meetings = meetings
+        self.races = races
+
+    # Paths ---------------------------------------------------------------
+
+    def meeting_path(self, m: int) -> str:
+        return f"/en/reunion-du-jour/{self.date}/R{m}-{TRACKS[(m - 1) % len(TRACKS)].lower()}"
+
+    def race_path(self, key: str) -> str:
+        return f"/en/course/{self.date}/{key}-prix-fixture-{key.lower()}"
+
+    # Pages ---------------------------------------------------------------
+
+    def day_page(self) -> str:
+        links = "".join(f'<li><a href="{self.meeting_path(m)}">R{m} {TRACKS[(m - 1) % len(TRACKS)]}</a></li>'
+                        for m in range(1, self.meetings + 1))
+        return f"<html><body><h1>Results {self.date}</h1><ul>{links}</ul></body></html>"
+
+    def meeting_page(self, m: int) -> str:
+        rows = "".join(
+            f'<tr class="item"><td><span class="zt-trot"></span></td>'
+            f'<td class="nom"><a href="{self.race_path(f"R{m}C{c}")}">Prix Fixture C{c}</a></td></tr>'
+            for c in range(1, self.races + 1))
+        track = TRACKS[(m - 1) % len(TRACKS)]
+        return (f'<html><body><div class="numero-reunion-wrapper"><span class="fi fi-fr"></span> R{m} FRANCE</div>'
+                f'<h1 class="nom-reunion">{track.upper()} - FRANCE</h1><table>{rows}</table></body></html>')
+
+    def race_page(self, market: Market, now: float) -> str:
+        odds, next_in = market.current(now)
+        off = datetime.fromtimestamp(market.off, timezone.utc)
+        nav = "".join(f'<a href="{self.race_path(f"R{market.meeting}C{c}")}">C{c}</a> '
+                      for c in range(1, self.races + 1))
+        rows = []
+        for runner, price in zip(market.runners, odds):
+            shoes = '<span class="ferrure-rouge"></span>' * runner["red_shoes"]
+            status = "Non partant" if runner["non_runner"] else ""
+            rows.append(
+                f'<tr><td class="numero">{runner["number"]}</td>'
+                f'<td><img src="/fixture/casaque/{runner["number"]}.png"></td>'
+                f'<td><a class="horse-name">{runner["name"]}</a> <span class="jockey">{runner["jockey"]}</span> {status}</td>'
+                f'<td class="cote">{"-" if price is None else price}</td><td>{shoes}</td></tr>')
+        winner = market.result(now, self.result_delay)
+        results = (f'<table class="resultats-table"><tr><td class="nom-cheval">{winner}</td></tr></table>'
+                   if winner else "")
+        return (
+            f"<html><body><nav>{nav}</nav>"
+            f"<h1>{market.key} - {TRACKS[(market.meeting - 1) % len(TRACKS)]} - Prix Fixture</h1>"
+            f'<div class="heure-course"><span data-timestamp="{int(market.off)}">{off:%H}h{off:%M}</span></div>'
+            f"<p>Attelé - 2700m</p>"
+            f'<span id="dermin-refresh" data-ttl="{next_in}"></span>'
+            f'<button id="update-cotes-btn">Update odds</button>'
+            f'{results}<table class="table-runners">{"".join(rows)}</table>'
+            f"{REFRESH_SCRIPT % {'key': market.key}}</body></html>")
+
+    def recorded_page(self, path: str, market: Market, now: float):
+        file_path = os.path.join(self.pages_dir, path.strip("/") + ".html")
+        if not os.path.isfile(file_path):
+            return None
+        with open(file_path, encoding="utf-8") as f:
+            html = f.read()
+        odds = iter(market.current(now)[0])
+        html = re.sub(r'(<td[^>]*class="[^"]*\bcote\b[^"]*"[^>]*>)(.*?)(</td>)',
+                      lambda m: f"{m.group(1)}{next(odds, None) or '-'}{m.group(3)}", html, flags=re.S)
+        script = REFRESH_SCRIPT % {"key": market.key}
+        return html.replace("</body>", script + "</body>") if "</body>" in html else html + script
+
+    def state(self, now: float) -> dict:
+        races = []
+        for market in self.markets.values():
+            market.current(now)
+            races.append({
+                "key": market.key,
+                "url": self.race_path(market.key),
+                "off": market.off,
+                "runners": [r["name"] for r in market.runners],
+                "publishes": [{"at": at, "odds": odds} for at, odds in market.publishes],
+                "winner": market.result(now, self.result_delay),
+            })
+        return {"date": self.date, "meetings": [self.meeting_path(m) for m in range(1, self.meetings + 1)], "races": races}
+
+
+def make_handler(fixture: Fixture):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: str, content_type: str = "text/html; charset=utf-8"):
+            data = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            now = time.time()
+            if path.startswith("/en/resultats-et-rapports-du-jour/"):
+                return self._send(200, fixture.day_page())
+            match = re.match(r"^/en/reunion-du-jour/[^/]+/R(\d+)-", path)
+            if match and 1 <= int(match.group(1)) <= fixture.meetings:
+                return self._send(200, fixture.meeting_page(int(match.group(1))))
+            match = re.match(r"^/en/course/[^/]+/(R\d+C\d+)-", path)
+            if match and match.group(1) in fixture.markets:
+                market = fixture.markets[match.group(1)]
+                page = fixture.recorded_page(path, market, now) if fixture.pages_dir else None
+                return self._send(200, page or fixture.race_page(market, now))
+            match = re.match(r"^/fixture/odds/(R\d+C\d+)$", path)
+            if match and match.group(1) in fixture.markets:
+                odds, next_in = fixture.markets[match.group(1)].current(now)
+                body = {"odds": ["-" if o is None else o for o in odds], "next_in": next_in}
+                return self._send(200, json.dumps(body), "application/json")
+            if path == "/fixture/state":
+                return self._send(200, json.dumps(fixture.state(now)), "application/json")
+            if path.startswith("/fixture/casaque/"):
+                self.send_response(204)
+                self.end_headers()
+                return
+            self._send(404, "<html><body>Not found</body></html>")
+
+    return Handler
+
+
+def serve(fixture: Fixture, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Start serving in a background thread and return the server (call .shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), make_handler(fixture))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_fixture_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--meetings", type=int, default=4)
+    parser.add_argument("--races", type=int, default=8, help="Races per meeting")
+    parser.add_argument("--runners", type=int, default=14, help="Runners per race")
+    parser.add_argument("--ttl", type=float, default=10, help="Seconds between odds publishes")
+    parser.add_argument("--first-off", type=float, default=1800, help="Seconds until the first race goes off")
+    parser.add_argument("--interval", type=float, default=1800, help="Seconds between races of a meeting")
+    parser.add_argument("--result-delay", type=float, default=120, help="Seconds from the off to the result")
+    parser.add_argument("--pages", help="Directory of recorded race pages to serve instead of generated ones")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def fixture_from_args(args) -> Fixture:
+    return Fixture(args.meetings, args.races, args.runners, args.ttl, args.first_off,
+                   args.interval, args.result_delay, args.pages, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Zeturf stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_fixture_args(parser)
+    args = parser.parse_args()
+
+    fixture = fixture_from_args(args)
+    server = serve(fixture, args.host, args.port)
+    base = f"http://{args.host}:{args.port}"
+    print(f"Serving {len(fixture.markets)} races on {base} (ZETURF_BASE_URL={base})")
+    print(f"Day page: {base}/en/resultats-et-rapports-du-jour/{fixture.date}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
 'use client';
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef, useCallback } from 'react';
 import useSWR from 'swr';
-import { fetchRaces, monitorRace, resetDatabase } from '../lib/api';
+import { syncRaces, subscribeRaces, fetchAlerts, fetchProgram, monitorRace, monitorRaces, resetDatabase, Alert, ProgramMeeting } from '../lib/api';
 import RaceCard from '../components/RaceCard';
 import { LayoutList, Map, Clock, AlertCircle, Menu, X, Trash2 } from 'lucide-react';
 
+// Rules that play the alert sound; the others only show up in /alerts.
+// Comma-separated rule names, defaults to the dashboard's original D4 steamer alert
+const SOUNDING_RULES = new Set(
+    (process.env.NEXT_PUBLIC_ALERT_SOUND_RULES || 'd4_steamer').split(',').map(rule => rule.trim()).filter(Boolean)
+);
+
 interface Race {
     id: number;
     url: string;
@@ -16,8 +22,47 @@ interface Race {
 }
 
 export default function Home() {
-    const { data: races, error, mutate } = useSWR<Race[]>('/races', fetchRaces, {
-        refreshInterval: 2000,
+    // Live stream pushes updates; polling only runs while it is disconnected
+    const [live, setLive] = useState(false);
+    const { data: races, error, mutate } = useSWR<Race[]>('/races', syncRaces, {
+        refreshInterval: live ? 0 : 2000,
+    });
+
+    // Alerts are evaluated by the backend; the dashboard only sounds them
+    const lastAlertId = useRef(0);
+    const handleAlert = useCallback((alert: Alert) => {
+        if (alert.id <= lastAlertId.current) return;
+        lastAlertId.current = alert.id;
+        if (!SOUNDING_RULES.has(alert.rule)) return;
+        const audio = new Audio('/alert.mp3');
+        audio.play().catch(e => console.log("Audio play failed", e));
+    }, []);
+
+    useEffect(() => {
+        return subscribeRaces((latest) => mutate(latest, false), setLive, handleAlert);
+    }, [mutate, handleAlert]);
+
+    useEffect(() => {
+        if (live) return;
+        const interval = setInterval(async () => {
+            try {
+                const alerts = await fetchAlerts(lastAlertId.current);
+                if (lastAlertId.current === 0 && alerts.length > 0) {
+                    // First poll: don't replay alerts raised before the page was opened
+                    lastAlertId.current = alerts[alerts.length - 1].id;
+                    return;
+                }
+                alerts.forEach(handleAlert);
+            } catch (e) {
+                console.error(e);
+            }
+        }, 2000);
+        return () => clearInterval(interval);
+    }, [live, handleAlert]);
+
+    // The card changes rarely; the backend refreshes its cache in the background
+    const { data: program } = useSWR<ProgramMeeting[]>('/program', fetchProgram, {
+        refreshInterval: 5 * 60 * 1000,
     });
 
     const [newUrl, setNewUrl] = useState('');
@@ -34,7 +79,15 @@ export default function Home() {
 
         setAdding(true);
         try {
-            await monitorRace(newUrl);
+            // Several pasted URLs or a meeting page go through the batch endpoint
+            const urls = newUrl.split(/\s+/).filter(Boolean);
+            const meetingUrl = urls.find((u) => u.includes('/reunion-du-jour/'));
+            if (meetingUrl || urls.length > 1) {
+                const result = await monitorRaces(urls.filter((u) => u !== meetingUrl), meetingUrl);
+                if (result.error) throw new Error(result.error);
+            } else {
+                await monitorRace(urls[0]);
+            }
             setNewUrl('');
             mutate();
         } catch (err) {
@@ -45,6 +98,21 @@ export default function Home() {
         }
     };
 
+    const handleTrack = async (raceUrl?: string, meetingUrl?: string) => {
+        try {
+            if (meetingUrl) {
+                const result = await monitorRaces([], meetingUrl);
+                if (result.error) throw new Error(result.error);
+            } else if (raceUrl) {
+                await monitorRace(raceUrl);
+            }
+            mutate();
+        } catch (err) {
+            console.error(err);
+            alert('Failed to track race');
+        }
+    };
+
     const handleReset = async () => {
         if (!confirm("Are you sure? This will remove all races EXCEPT the latest one.")) return;
         setResetting(true);
@@ -100,6 +168,39 @@ export default function Home() {
                         </button>
                     </div>
 
+                    {program && program.length > 0 && (
+                        <div className="mt-8 pt-8 border-t border-slate-800/50">
+                            <div className="px-4 text-[10px] font-bold text-slate-500 uppercase tracking-[0.15em] mb-3">
+                                Today&apos;s Card
+                            </div>
+                            {program.map((meeting) => (
+                                <div key={meeting.url} className="mb-4">
+                                    <button
+                                        onClick={() => handleTrack(undefined, meeting.url)}
+                                        title="Track every race of this meeting"
+                                        className="w-full text-left px-4 py-1.5 text-xs font-bold text-slate-300 hover:text-blue-400 transition-colors truncate"
+                                    >
+                                        R{meeting.number} {meeting.name}
+                                    </button>
+                                    {meeting.races.map((race) => (
+                                        <button
+                                            key={race.url}
+                                            onClick={() => handleTrack(race.url)}
+                                            disabled={race.race_id != null}
+                                            className={`w-full flex items-center gap-2 px-4 py-1 text-xs rounded-lg transition-colors ${race.race_id != null ? 'text-blue-400/70 cursor-default' : 'text-slate-400 hover:text-white hover:bg-slate-800/30'}`}
+                                        >
+                                            <span className="font-bold tabular-nums w-7">C{race.race_number}</span>
+                                            <span className="tabular-nums text-slate-500">
+                                                {race.post_time ? new Date(race.post_time + 'Z').toLocaleTimeString('fr-FR', { timeZone: 'Europe/Paris', hour: '2-digit', minute: '2-digit' }) : '--:--'}
+                                            </span>
+                                            <span className="truncate">{race.name}</span>
+                                        </button>
+                                    ))}
+                                </div>
+                            ))}
+                        </div>
+                    )}
+
                     <div className="mt-8 pt-8 border-t border-slate-800/50">
                         <div className="px-4 text-[10px] font-bold text-slate-500 uppercase tracking-[0.15em] mb-3">
                             Management
@@ -141,8 +242,8 @@ export default function Home() {
                         <form onSubmit={handleAddStart} className="flex gap-2 bg-slate-800/50 p-1.5 rounded-2xl border border-slate-700/50 backdrop-blur-sm self-start md:self-center w-full md:w-auto">
                             <input
                                 suppressHydrationWarning
-                                type="url"
-                                placeholder="Paste Zeturf race URL..."
+                                type="text"
+                                placeholder="Paste Zeturf race or meeting URLs..."
                                 value={newUrl}
                                 onChange={(e) => setNewUrl(e.target.value)}
                                 className="flex-1 bg-transparent border-none focus:ring-0 text-sm px-4 text-white placeholder:text-slate-500 w-full min-w-[280px]"
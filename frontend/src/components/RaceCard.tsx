@@ -1,6 +1,6 @@
 'use client';
 import { useState, useEffect, useMemo } from 'react';
-import { setBaseline, refreshRace } from '../lib/api';
+import { setBaseline, refreshRace, fetchRaceHistory, silkUrl, OddsSeries } from '../lib/api';
 import { Clock, LayoutList } from 'lucide-react';
 
 interface Runner {
@@ -17,6 +17,9 @@ interface Runner {
     is_previous_steamer: boolean; // New
     is_non_runner?: boolean; // New
     jockey?: string; // New
+    implied_probability?: number | null;
+    market_share?: number | null; // % of the book, overround removed
+    market_share_shift?: number; // points since baseline
     last_updated: string;
 }
 
@@ -28,13 +31,50 @@ interface Race {
     is_active: boolean;
     winner_name?: string;
     start_time?: string; // New
+    overround?: number | null; // book %, 100 = fair
+    last_changed_at?: string | null;
+    is_stale?: boolean; // odds older than the race's freshness budget
     runners: Runner[];
 }
 
+// Refetch live sparklines this often; finished races are fetched once
+const HISTORY_REFRESH_MS = 30000;
+
+function Sparkline({ series }: { series?: OddsSeries }) {
+    if (!series || series.odds.length < 2) return null;
+    const width = 56, height = 18;
+    const t0 = series.t[0], t1 = series.t[series.t.length - 1];
+    const lo = Math.min(...series.odds), hi = Math.max(...series.odds);
+    const x = (t: number) => ((t - t0) / (t1 - t0 || 1)) * width;
+    // Shorter odds plot higher, so a steamer's line rises
+    const y = (o: number) => ((o - lo) / (hi - lo || 1)) * height;
+    const path = series.odds.map((o, i) => `${x(series.t[i]).toFixed(1)},${y(o).toFixed(1)}`).join(' ');
+    const shortened = series.odds[series.odds.length - 1] < series.odds[0];
+    return (
+        <svg width={width} height={height} className="mt-1 overflow-visible">
+            <polyline points={path} fill="none" strokeWidth={1.5} className={shortened ? 'stroke-green-400' : 'stroke-slate-500'} />
+        </svg>
+    );
+}
+
 export default function RaceCard({ race, onRefresh }: { race: Race; onRefresh: () => void }) {
     const [loading, setLoading] = useState(false);
     const [sortConfig, setSortConfig] = useState<{ key: keyof Runner | 'steam_percentage' | 'flags'; direction: 'ascending' | 'descending' } | null>(null);
     const [timeLeft, setTimeLeft] = useState<string>('');
+    const [history, setHistory] = useState<Record<number, OddsSeries>>({});
+
+    useEffect(() => {
+        let cancelled = false;
+        const load = () => fetchRaceHistory(race.id)
+            .then(series => {
+                if (!cancelled) setHistory(Object.fromEntries(series.map(s => [s.runner_id, s])));
+            })
+            .catch(() => {});
+        load();
+        if (!race.is_active) return () => { cancelled = true; };
+        const interval = setInterval(load, HISTORY_REFRESH_MS);
+        return () => { cancelled = true; clearInterval(interval); };
+    }, [race.id, race.is_active]);
 
     useEffect(() => {
         if (!race.start_time) {
@@ -90,14 +130,6 @@ export default function RaceCard({ race, onRefresh }: { race: Race; onRefresh: (
             : '';
     }, [race.start_time]);
 
-    useEffect(() => {
-        const alertRunners = displayRunners.filter(r => r.is_d4 && r.steam_percentage >= 10);
-        if (alertRunners.length > 0 && race.is_active) {
-            const audio = new Audio('/alert.mp3');
-            audio.play().catch(e => console.log("Audio play failed", e));
-        }
-    }, [race, displayRunners]);
-
     const sortedRunners = useMemo(() => {
         return [...displayRunners].sort((a, b) => {
             if (!sortConfig) return 0;
@@ -152,6 +184,9 @@ export default function RaceCard({ race, onRefresh }: { race: Race; onRefresh: (
                                 {timeLeft}
                             </div>
                         )}
+                        {race.is_active && race.is_stale && (
+                            <span className="bg-amber-500/10 text-amber-400 text-[10px] font-bold px-3 py-1 rounded-full uppercase tracking-widest border border-amber-500/20" title="No successful scrape within the freshness budget; odds may be out of date">Stale</span>
+                        )}
                         {!race.is_active && (
                             <span className="bg-slate-800 text-slate-500 text-[10px] font-bold px-3 py-1 rounded-full uppercase tracking-widest border border-slate-700">Final</span>
                         )}
@@ -161,6 +196,11 @@ export default function RaceCard({ race, onRefresh }: { race: Race; onRefresh: (
                             <Clock size={12} />
                             {timeString} GMT
                         </div>
+                        {race.overround != null && (
+                            <span className="uppercase tracking-widest tabular-nums" title="Book percentage of the declared field">
+                                Book {race.overround.toFixed(1)}%
+                            </span>
+                        )}
                         <a href={race.url} target="_blank" className="hover:text-blue-400 transition-colors truncate max-w-[240px] opacity-60 hover:opacity-100">
                             {race.url}
                         </a>
@@ -245,7 +285,7 @@ export default function RaceCard({ race, onRefresh }: { race: Race; onRefresh: (
                                     <td className="px-4 py-5">
                                         <div className="relative group/silk">
                                             {runner.silk_url ? (
-                                                <img src={runner.silk_url} alt="Silk" className="w-10 h-10 object-contain drop-shadow-2xl transform group-hover/silk:scale-125 transition-transform" />
+                                                <img src={silkUrl(runner.silk_url)} alt="Silk" className="w-10 h-10 object-contain drop-shadow-2xl transform group-hover/silk:scale-125 transition-transform" />
                                             ) : (
                                                 <div className="w-10 h-10 rounded-full bg-slate-800/50 border border-slate-700 flex items-center justify-center">
                                                     <span className="text-[10px] text-slate-400 font-bold">??</span>
@@ -268,6 +308,17 @@ export default function RaceCard({ race, onRefresh }: { race: Race; onRefresh: (
                                         <div className="inline-block px-3 py-1 bg-slate-800/80 border border-slate-600 rounded-lg shadow-lg">
                                             <span className="text-md font-black text-white drop-shadow-[0_1px_1px_rgba(0,0,0,0.8)] tabular-nums">{runner.current_odds.toFixed(1)}</span>
                                         </div>
+                                        <Sparkline series={history[runner.id]} />
+                                        {runner.market_share != null && (
+                                            <div className="text-[9px] font-bold text-slate-400 tabular-nums mt-1" title="Share of market (shift since baseline)">
+                                                {runner.market_share.toFixed(1)}%
+                                                {!!runner.market_share_shift && (
+                                                    <span className={runner.market_share_shift > 0 ? 'text-green-400' : 'text-red-400'}>
+                                                        {' '}{runner.market_share_shift > 0 ? '+' : ''}{runner.market_share_shift.toFixed(1)}
+                                                    </span>
+                                                )}
+                                            </div>
+                                        )}
                                     </td>
                                     <td className="px-4 py-5">
                                         <span className="text-sm font-bold text-slate-400 tabular-nums drop-shadow-sm">
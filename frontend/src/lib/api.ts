@@ -1,13 +1,241 @@
 const API_URL = 'https://horse-racing-backend.fly.dev';
 
-export async function fetchRaces() {
-    const res = await fetch(`${API_URL}/races`, { cache: 'no-store' });
+const PMU_SILKS_URL = 'https://www.pmu.fr/back-assets/hippique/casaques/';
+
+// PMU silk images go through the backend's cached /silks proxy
+export function silkUrl(url?: string) {
+    if (url && url.startsWith(PMU_SILKS_URL)) {
+        return `${API_URL}/silks/${url.slice(PMU_SILKS_URL.length)}`;
+    }
+    return url;
+}
+
+export interface RaceQuery {
+    active_only?: boolean;
+    date_from?: string;
+    date_to?: string;
+    limit?: number;
+    cursor?: string;
+    running_only?: boolean;
+    fields?: string[];
+}
+
+function queryParams(query: RaceQuery) {
+    const params = new URLSearchParams();
+    for (const [key, value] of Object.entries(query)) {
+        if (value === undefined || value === false) continue;
+        params.set(key, Array.isArray(value) ? value.join(',') : String(value));
+    }
+    return params;
+}
+
+// What the dashboard shows: races posted from today's midnight on, and only
+// runners still in the race, so board loads don't grow with the database.
+// Fixed for the page's lifetime so syncRaces() and the stream keep agreeing.
+let boardQuery: RaceQuery | null = null;
+
+export function boardView(): RaceQuery {
+    if (!boardQuery) {
+        const midnight = new Date();
+        midnight.setHours(0, 0, 0, 0);
+        // Naive UTC, like the backend's timestamps
+        boardQuery = { date_from: midnight.toISOString().slice(0, 19), running_only: true };
+    }
+    return boardQuery;
+}
+
+export async function fetchRaces(query: RaceQuery = {}) {
+    const params = queryParams(query);
+    const res = await fetch(params.toString() ? `${API_URL}/races?${params}` : `${API_URL}/races`, { cache: 'no-store' });
+    if (!res.ok) {
+        throw new Error('Failed to fetch data');
+    }
+    return res.json();
+}
+
+// Client-side copy of the board (one view of it), kept current by merging /races/changes deltas
+let board: { version: string; view: string; races: any[] } | null = null;
+
+function sortRaces(races: any[]) {
+    // Same order as the backend: active first, then most recently bumped, then newest
+    return races.sort((a, b) =>
+        Number(b.is_active) - Number(a.is_active)
+        || (b.last_bumped_at || '').localeCompare(a.last_bumped_at || '')
+        || b.id - a.id
+    );
+}
+
+function mergeRaceChanges(races: any[], delta: any) {
+    const byId = new Map(races.map((race) => [race.id, race]));
+    for (const changed of delta.races) {
+        const existing = byId.get(changed.id);
+        if (!existing) {
+            byId.set(changed.id, changed);
+            continue;
+        }
+        const runners = new Map(existing.runners.map((r: any) => [r.id, r]));
+        for (const runner of changed.runners) {
+            runners.set(runner.id, runner);
+        }
+        byId.set(changed.id, { ...changed, runners: Array.from(runners.values()) });
+    }
+    for (const id of delta.deleted) {
+        byId.delete(id);
+    }
+    return sortRaces(Array.from(byId.values()));
+}
+
+function viewParams(since: boolean) {
+    const params = queryParams(boardView());
+    const view = params.toString();
+    if (since && board && board.view === view) {
+        params.set('since', board.version);
+    }
+    return { view, params };
+}
+
+// Versions are "<epoch>-<counter>" cursors; only the same process's can be ordered
+function isOlder(version: string, than: string) {
+    const [epoch, counter] = version.split('-').map(Number);
+    const [thanEpoch, thanCounter] = than.split('-').map(Number);
+    return epoch === thanEpoch && counter < thanCounter;
+}
+
+// Null when the delta brings a race this view doesn't have yet (added, or
+// moved into the view): it only carries the changed runners, so the caller
+// has to reload the view
+function applyRaceChanges(delta: any, view: string) {
+    if (board && board.view === view && isOlder(delta.version, board.version)) {
+        // A /races/changes response (SWR revalidation) computed before a
+        // stream event we already merged: applying it would roll runners back
+        return board.races;
+    }
+    if (delta.full) {
+        board = { version: delta.version, view, races: delta.races };
+        return board.races;
+    }
+    if (!board || board.view !== view) {
+        return null;
+    }
+    const known = new Set(board.races.map((race) => race.id));
+    if (delta.races.some((race: any) => !known.has(race.id))) {
+        return null;
+    }
+    if (delta.races.length > 0 || delta.deleted.length > 0) {
+        board = { version: delta.version, view, races: mergeRaceChanges(board.races, delta) };
+    } else {
+        // Nothing changed: keep the same array so SWR skips re-rendering
+        board.version = delta.version;
+    }
+    return board.races;
+}
+
+async function fetchRaceChanges(since: boolean) {
+    const { view, params } = viewParams(since);
+    const res = await fetch(`${API_URL}/races/changes?${params}`, { cache: 'no-store' });
     if (!res.ok) {
         throw new Error('Failed to fetch data');
     }
+    return applyRaceChanges(await res.json(), view);
+}
+
+export async function syncRaces() {
+    return (await fetchRaceChanges(true)) ?? (await fetchRaceChanges(false))!;
+}
+
+export interface Alert {
+    id: number; // keeps increasing across backend restarts
+    rule: string;
+    label: string;
+    race_id: number;
+    race_name: string;
+    runner_id: number;
+    runner_name: string;
+    number: number;
+    odds: number;
+    steam_percentage: number;
+    at: string;
+}
+
+// Push updates over server-sent events. The browser reconnects on its own and
+// resumes from the last event id; `onStatus` reports whether the stream is up
+// so callers can fall back to polling while it is not.
+export function subscribeRaces(
+    onRaces: (races: any[]) => void,
+    onStatus: (live: boolean) => void,
+    onAlert?: (alert: Alert) => void,
+) {
+    if (typeof EventSource === 'undefined') {
+        onStatus(false);
+        return () => {};
+    }
+    const { view, params } = viewParams(true);
+    const source = new EventSource(`${API_URL}/races/stream?${params}`);
+    source.onopen = () => onStatus(true);
+    source.onerror = () => onStatus(false);
+    source.addEventListener('changes', (event) => {
+        const races = applyRaceChanges(JSON.parse((event as MessageEvent).data), view);
+        if (races) {
+            onRaces(races);
+        } else {
+            fetchRaceChanges(false).then((full) => full && onRaces(full)).catch(console.error);
+        }
+    });
+    source.addEventListener('alert', (event) => {
+        onAlert?.(JSON.parse((event as MessageEvent).data));
+    });
+    return () => source.close();
+}
+
+// Alerts raised by the backend after `since` (used while the stream is down)
+export async function fetchAlerts(since: number): Promise<Alert[]> {
+    const res = await fetch(`${API_URL}/alerts?since=${since}`, { cache: 'no-store' });
+    if (!res.ok) {
+        throw new Error('Failed to fetch alerts');
+    }
     return res.json();
 }
 
+export interface OddsSeries {
+    runner_id: number;
+    t: number[]; // epoch seconds
+    odds: number[];
+}
+
+// Downsampled odds per runner for sparklines
+export async function fetchRaceHistory(raceId: number, points = 40, method = 'lttb'): Promise<OddsSeries[]> {
+    const res = await fetch(`${API_URL}/races/${raceId}/history?points=${points}&method=${method}`);
+    if (!res.ok) {
+        throw new Error('Failed to fetch history');
+    }
+    return (await res.json()).series;
+}
+
+export interface ProgramRace {
+    url: string;
+    name: string;
+    race_number?: number | null;
+    discipline: 'trot' | 'monte';
+    post_time?: string | null; // naive UTC
+    race_id?: number | null; // set when the race is already on the board
+}
+
+export interface ProgramMeeting {
+    url: string;
+    number?: number | null;
+    name?: string | null;
+    races: ProgramRace[];
+}
+
+// Today's French trotting card, from the backend's program cache
+export async function fetchProgram(): Promise<ProgramMeeting[]> {
+    const res = await fetch(`${API_URL}/program`);
+    if (!res.ok) {
+        throw new Error('Failed to fetch program');
+    }
+    return (await res.json()).meetings;
+}
+
 export async function monitorRace(url: string) {
     const res = await fetch(`${API_URL}/monitor?url=${encodeURIComponent(url)}`, {
         method: 'POST',
@@ -15,6 +243,16 @@ export async function monitorRace(url: string) {
     return res.json();
 }
 
+// Add or bump several races at once; a meeting URL expands to its trotting races
+export async function monitorRaces(urls: string[], meetingUrl?: string) {
+    const res = await fetch(`${API_URL}/monitor/batch`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ urls, meeting_url: meetingUrl }),
+    });
+    return res.json();
+}
+
 export async function setBaseline(raceId: number) {
     const res = await fetch(`${API_URL}/baseline/${raceId}`, {
         method: 'POST',
@@ -0,0 +1,278 @@
+"""
+Load-generate dashboard clients against the backend.
+
+    python loadgen.py --url https://horse-racing-backend.fly.dev --pollers 200 --duration 60
+    python loadgen.py --spawn --pollers 300 --streams 100 --mode changes --json load.json
+
+Client kinds (run side by side):
+  pollers   SWR-style: request, wait --interval (2 s), repeat. --mode picks
+            what they poll: races (plain /races), etag (/races with
+            If-None-Match) or changes (/races/changes?since=, what the
+            dashboard does now)
+  streams   EventSource-style subscribers on /races/stream that reconnect
+            with Last-Event-ID when dropped
+
+With --spawn the backend is started locally on a temp database with a
+synthetic scrape feed: --feed-races fixture markets (fixture_server.py)
+are pushed through save_race_data/commit_changes every --feed-interval
+seconds, so clients see a board that changes like a live one. The spawned
+server's CPU and RSS are sampled from /proc once a second.
+
+Needs httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Synthetic feed (runs inside the spawned backend) --------------------------
+
+def feed_app():
+    """uvicorn factory: the backend app plus a synthetic scrape feed configured by LOADGEN_* env vars."""
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+    from fixture_server import Fixture
+
+    fixture = Fixture(meetings=1, races=int(os.environ.get("LOADGEN_RACES", "8")),
+                      runners=int(os.environ.get("LOADGEN_RUNNERS", "14")),
+                      ttl=float(os.environ.get("LOADGEN_INTERVAL", "2")),
+                      first_off=7200, interval=600, result_delay=600)
+
+    @main.app.on_event("startup")
+    async def start_feed():
+        asyncio.create_task(synthetic_feed(main, fixture, float(os.environ.get("LOADGEN_INTERVAL", "2"))))
+
+    return main.app
+
+
+async def synthetic_feed(main, fixture, interval: float):
+    from sqlmodel import Session
+    from changes import commit_changes, mark_changed
+    from database import engine
+    from models import Race
+
+    with Session(engine) as session:
+        race_ids = {}
+        for key in fixture.markets:
+            race = Race(url=fixture.race_path(key), name="Wait for scrape...", meeting="Load test", is_active=False)
+            session.add(race)
+            session.flush()
+            mark_changed(session, race.id)
+            race_ids[key] = race.id
+        commit_changes(session)
+
+    while True:
+        started = time.perf_counter()
+        for key, market in fixture.markets.items():
+            market.advance(time.time())
+            with Session(engine) as session:
+                race = session.get(Race, race_ids[key])
+                main.save_race_data(session, race, market.scrape_result())
+                commit_changes(session)
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+# Clients ------------------------------------------------------------------
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self.bytes = 0
+        self.events = 0
+        self.reconnects = 0
+
+    def summary(self, duration: float) -> dict:
+        lat = sorted(self.latencies)
+        pick = lambda pct: round(lat[min(len(lat) - 1, int(len(lat) * pct / 100))] * 1000, 1) if lat else None
+        total = len(self.latencies) + self.errors
+        return {
+            "requests": total,
+            "rps": round(total / duration, 1),
+            "errors": self.errors,
+            "error_rate": round(self.errors / total * 100, 2) if total else 0.0,
+            "statuses": self.statuses,
+            "p50_ms": pick(50), "p95_ms": pick(95), "p99_ms": pick(99),
+            "mbytes": round(self.bytes / 2**20, 2),
+            "events": self.events,
+            "reconnects": self.reconnects,
+        }
+
+
+async def poller(client: httpx.AsyncClient, url: str, mode: str, interval: float, stop: float, stats: Stats):
+    await asyncio.sleep(random.uniform(0, interval))  # Dashboards don't open in lockstep
+    etag, since = None, None
+    while time.time() < stop:
+        headers, target = {}, f"{url}/races"
+        if mode == "etag" and etag:
+            headers["If-None-Match"] = etag
+        if mode == "changes":
+            target = f"{url}/races/changes" + (f"?since={since}" if since else "")
+        started = time.perf_counter()
+        try:
+            response = await client.get(target, headers=headers)
+            stats.latencies.append(time.perf_counter() - started)
+            stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+            stats.bytes += len(response.content)
+            if response.status_code >= 500:
+                stats.errors += 1
+            elif mode == "etag":
+                etag = response.headers.get("etag", etag)
+            elif mode == "changes" and response.status_code == 200:
+                since = response.json().get("version", since)
+        except httpx.HTTPError:
+            stats.errors += 1
+        await asyncio.sleep(interval)
+
+
+async def streamer(client: httpx.AsyncClient, url: str, stop: float, stats: Stats):
+    last_id = None
+    while time.time() < stop:
+        headers = {"Last-Event-ID": last_id} if last_id else {}
+        try:
+            started = time.perf_counter()
+            async with client.stream("GET", f"{url}/races/stream", headers=headers,
+                                     timeout=httpx.Timeout(10, read=None)) as response:
+                stats.latencies.append(time.perf_counter() - started)  # Time to headers
+                stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+                async for line in response.aiter_lines():
+                    stats.bytes += len(line) + 1
+                    if line.startswith("id: "):
+                        last_id = line[4:]
+                    elif line == "event: changes":
+                        stats.events += 1
+                    if time.time() >= stop:
+                        return
+        except httpx.HTTPError:
+            stats.errors += 1
+        stats.reconnects += 1
+        await asyncio.sleep(1)
+
+
+# Server sampling ----------------------------------------------------------
+
+async def sample_process(pid: int, stop: float, samples: list):
+    ticks = os.sysconf("SC_CLK_TCK")
+    page = os.sysconf("SC_PAGE_SIZE")
+    last = None
+    while time.time() < stop:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{pid}/statm") as f:
+                rss = int(f.read().split()[1]) * page / 2**20
+        except OSError:
+            return
+        cpu = (int(fields[11]) + int(fields[12])) / ticks  # utime + stime
+        now = time.monotonic()
+        if last:
+            samples.append({"cpu_pct": (cpu - last[1]) / (now - last[0]) * 100, "rss_mb": rss})
+        last = (now, cpu)
+        await asyncio.sleep(1)
+
+
+def spawn_backend(args) -> subprocess.Popen:
+    env = dict(os.environ, LOADGEN_RACES=str(args.feed_races), LOADGEN_RUNNERS=str(args.feed_runners),
+               LOADGEN_INTERVAL=str(args.feed_interval), PYTHONPATH=ROOT_DIR)
+    env.pop("FLY_APP_NAME", None)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "loadgen:feed_app", "--factory", "--app-dir", ROOT_DIR,
+         "--port", str(args.port), "--log-level", "warning"],
+        cwd=tempfile.mkdtemp(prefix="loadgen-"), env=env)
+
+
+async def run(args) -> dict:
+    url = args.url.rstrip("/")
+    backend = None
+    if args.spawn:
+        url = f"http://127.0.0.1:{args.port}"
+        backend = spawn_backend(args)
+    try:
+        limits = httpx.Limits(max_connections=args.pollers + args.streams + 10, max_keepalive_connections=args.pollers + 10)
+        async with httpx.AsyncClient(limits=limits, timeout=args.timeout, headers={"Accept-Encoding": "gzip, br"}) as client:
+            if backend:
+                for _ in range(120):
+                    try:
+                        await client.get(f"{url}/races")
+                        break
+                    except httpx.HTTPError:
+                        await asyncio.sleep(0.5)
+
+            stop = time.time() + args.duration
+            poll_stats, stream_stats, server = Stats(), Stats(), []
+            tasks = [poller(client, url, args.mode, args.interval, stop, poll_stats) for _ in range(args.pollers)]
+            tasks += [streamer(client, url, stop, stream_stats) for _ in range(args.streams)]
+            if backend:
+                tasks.append(sample_process(backend.pid, stop, server))
+            started = time.time()
+            await asyncio.gather(*tasks)
+            duration = time.time() - started
+    finally:
+        if backend:
+            backend.terminate()
+            backend.wait(timeout=30)
+
+    report = {
+        "url": url, "mode": args.mode, "pollers": args.pollers, "streams": args.streams,
+        "duration": round(duration, 1),
+        "pollers_stats": poll_stats.summary(duration),
+        "streams_stats": stream_stats.summary(duration),
+    }
+    if server:
+        cpu = sorted(s["cpu_pct"] for s in server)
+        report["server"] = {
+            "cpu_mean_pct": round(sum(cpu) / len(cpu), 1),
+            "cpu_p95_pct": round(cpu[min(len(cpu) - 1, int(len(cpu) * 0.95))], 1),
+            "rss_max_mb": round(max(s["rss_mb"] for s in server), 1),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate dashboard clients against /races")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Backend to load (ignored with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="Start a local backend with a synthetic feed")
+    parser.add_argument("--port", type=int, default=8200, help="Port for --spawn")
+    parser.add_argument("--pollers", type=int, default=100)
+    parser.add_argument("--streams", type=int, default=0)
+    parser.add_argument("--mode", choices=("races", "etag", "changes"), default="races", help="What pollers request")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between a poller's requests")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--timeout", type=float, default=10, help="Per-request timeout (seconds)")
+    parser.add_argument("--feed-races", type=int, default=8)
+    parser.add_argument("--feed-runners", type=int, default=14)
+    parser.add_argument("--feed-interval", type=float, default=2.0, help="Seconds between synthetic ticks")
+    parser.add_argument("--json", dest="json_out", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    for kind in ("pollers", "streams"):
+        stats = report[f"{kind}_stats"]
+        if not report[kind]:
+            continue
+        print(f"{kind:<8} {report[kind]} clients: {stats['requests']} requests ({stats['rps']}/s), "
+              f"errors {stats['error_rate']}%, p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, "
+              f"p99 {stats['p99_ms']} ms, {stats['mbytes']} MB, statuses {stats['statuses']}"
+              + (f", {stats['events']} events, {stats['reconnects']} reconnects" if kind == "streams" else ""))
+    if "server" in report:
+        server = report["server"]
+        print(f"server   CPU mean {server['cpu_mean_pct']}% p95 {server['cpu_p95_pct']}%, RSS max {server['rss_max_mb']} MB")
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
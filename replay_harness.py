@@ -0,0 +1,141 @@
+"""
+Run the real backend against fixture_server.py and measure how well it keeps
+up with N simulated markets.
+
+    python replay_harness.py --meetings 2 --races 8 --duration 300 --json harness.json
+
+Starts the fixture server in-process, starts the backend (uvicorn, fresh
+database in a temp directory, ZETURF_BASE_URL pointed at the fixture), adds
+every fixture meeting through /monitor/batch, then polls the fixture's publish
+history and the backend's /races once per --poll seconds. A publish counts as
+seen when the backend's odds for that race first match it; its lag is the
+time from the publish to that poll. Reports, per race and overall, how many
+publishes were seen and p50/p95 lag.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+import fixture_server
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+
+
+def percentile(values, pct: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def start_backend(port: int, base_url: str, workdir: str) -> subprocess.Popen:
+    env = dict(os.environ, ZETURF_BASE_URL=base_url)
+    env.pop("FLY_APP_NAME", None)  # Keep the database in workdir
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR, "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env)
+
+
+def wait_for(url: str, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=2)
+            return
+        except requests.RequestException:
+            time.sleep(0.5)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def run(args) -> dict:
+    fixture = fixture_server.fixture_from_args(args)
+    server = fixture_server.serve(fixture, port=args.fixture_port)
+    fixture_url = f"http://127.0.0.1:{args.fixture_port}"
+    api = f"http://127.0.0.1:{args.port}"
+
+    workdir = tempfile.mkdtemp(prefix="replay-")
+    backend = start_backend(args.port, fixture_url, workdir)
+    try:
+        wait_for(f"{api}/races")
+        for meeting in fixture.state(time.time())["meetings"]:
+            reply = requests.post(f"{api}/monitor/batch", json={"meeting_url": fixture_url + meeting}, timeout=60)
+            print(f"Added {fixture_url + meeting}: {reply.json()}")
+
+        started = time.time()
+        seen = {}  # (race key, publish time) -> lag
+        expected = set()
+        while time.time() - started < args.duration:
+            poll_at = time.time()
+            state = requests.get(f"{fixture_url}/fixture/state", timeout=10).json()
+            board = {race["url"]: race for race in requests.get(f"{api}/races", timeout=10).json()}
+            for race in state["races"]:
+                backend_race = board.get(fixture_url + race["url"])
+                odds = {r["name"]: r["current_odds"] for r in backend_race["runners"]} if backend_race else {}
+                for publish in race["publishes"]:
+                    if publish["at"] < started:
+                        continue
+                    key = (race["key"], publish["at"])
+                    expected.add(key)
+                    if key in seen or not odds:
+                        continue
+                    if all(odds.get(name) == price for name, price in zip(race["runners"], publish["odds"]) if price):
+                        seen[key] = poll_at - publish["at"]
+            time.sleep(max(0.0, args.poll - (time.time() - poll_at)))
+
+        per_race = {}
+        for race_key, at in sorted(expected):
+            row = per_race.setdefault(race_key, {"publishes": 0, "seen": 0, "lags": []})
+            row["publishes"] += 1
+            if (race_key, at) in seen:
+                row["seen"] += 1
+                row["lags"].append(seen[(race_key, at)])
+        lags = list(seen.values())
+        return {
+            "races": len(fixture.markets),
+            "ttl": args.ttl,
+            "duration": args.duration,
+            "publishes": len(expected),
+            "seen": len(seen),
+            "tracked_races": sum(1 for row in per_race.values() if row["seen"]),
+            "lag_p50": percentile(lags, 50),
+            "lag_p95": percentile(lags, 95),
+            "per_race": {key: {"publishes": row["publishes"], "seen": row["seen"],
+                               "lag_p50": percentile(row["lags"], 50), "lag_p95": percentile(row["lags"], 95)}
+                         for key, row in per_race.items()},
+        }
+    finally:
+        backend.terminate()
+        backend.wait(timeout=30)
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the backend against simulated markets")
+    parser.add_argument("--port", type=int, default=8100, help="Backend port")
+    parser.add_argument("--fixture-port", type=int, default=8765)
+    parser.add_argument("--duration", type=float, default=300, help="Seconds to measure")
+    parser.add_argument("--poll", type=float, default=1.0, help="Seconds between samples")
+    parser.add_argument("--json", dest="json_out", help="Also write the report to this file")
+    fixture_server.add_fixture_args(parser)
+    args = parser.parse_args()
+
+    report = run(args)
+    fmt = lambda v: "-" if v is None else f"{v:.1f}s"
+    print(f"{report['tracked_races']}/{report['races']} races tracked, "
+          f"{report['seen']}/{report['publishes']} publishes seen, "
+          f"lag p50 {fmt(report['lag_p50'])} p95 {fmt(report['lag_p95'])}")
+    for key, row in report["per_race"].items():
+        print(f"  {key:<8}{row['seen']:>4}/{row['publishes']:<4} p50 {fmt(row['lag_p50'])}  p95 {fmt(row['lag_p95'])}")
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()